@@ -1,6 +1,35 @@
-import pandas as pd
 import argparse
-from rrc_utils import parse_rrc_log, create_qa_dataset
+import pyarrow as pa
+import pyarrow.parquet as pq
+from rrc_utils import parse_rrc_log_columns, group_qa_columns
+
+QA_SCHEMA = pa.schema([
+    ("Q_Timestamp", pa.float64()),
+    ("Q_Content", pa.large_string()),
+    ("A_Timestamp", pa.float64()),
+    ("A_Content", pa.large_string()),
+])
+# RRC message text compresses well with zstd but has too many distinct
+# values for dictionary encoding; the float timestamps are left as-is.
+QA_COMPRESSION = {
+    "Q_Timestamp": "none",
+    "Q_Content": "zstd",
+    "A_Timestamp": "none",
+    "A_Content": "zstd",
+}
+
+
+def write_qa_parquet(table: pa.Table, output_file: str) -> None:
+    """Write a Q/A table to parquet with the text-oriented compression profile."""
+    pq.write_table(
+        table,
+        output_file,
+        compression=QA_COMPRESSION,
+        compression_level={"Q_Content": 3, "A_Content": 3},
+        use_dictionary=False,
+        data_page_size=1 << 20,
+        row_group_size=64_000,
+    )
 
 
 def main() -> None:
@@ -14,37 +43,39 @@ def main() -> None:
     output_file = args.output_file
     
     print("Extracting RRC messages from log file...")
-    messages = parse_rrc_log(log_file)
+    log_columns = parse_rrc_log_columns(log_file)
+    message_count = len(log_columns["timestamp"])
     
-    if not messages:
+    if not message_count:
         print("No RRC messages found in the log file.")
-        # Create empty DataFrame with correct schema
-        empty_df = pd.DataFrame(columns=["Q_Timestamp", "Q_Content", "A_Timestamp", "A_Content"])
-        empty_df.to_parquet(output_file, index=False)
+        # Empty table with the correct schema
+        write_qa_parquet(QA_SCHEMA.empty_table(), output_file)
         print(f"Created empty parquet file: {output_file}")
         return
     
-    print(f"Found {len(messages)} RRC messages.")
+    print(f"Found {message_count} RRC messages.")
     
     # Create QA dataset
     print("Creating QA dataset...")
-    qa_df = create_qa_dataset(messages)
+    qa_columns = group_qa_columns(log_columns)
     
-    if qa_df.empty:
+    if not qa_columns["Q_Timestamp"]:
         print("No QA pairs could be formed from the extracted messages.")
-        # Create empty DataFrame with correct schema
-        empty_df = pd.DataFrame(columns=["Q_Timestamp", "Q_Content", "A_Timestamp", "A_Content"])
-        empty_df.to_parquet(output_file, index=False)
+        # Empty table with the correct schema
+        write_qa_parquet(QA_SCHEMA.empty_table(), output_file)
         print(f"Created empty parquet file: {output_file}")
         return
     
-    print(f"Created {len(qa_df)} QA pairs.")
+    print(f"Created {len(qa_columns['Q_Timestamp'])} QA pairs.")
     
     # Save to parquet
     print(f"Saving to {output_file}...")
-    qa_df.to_parquet(output_file, index=False)
+    table = pa.table(qa_columns, schema=QA_SCHEMA)
+    write_qa_parquet(table, output_file)
     
     print("Done!")
+    # pandas is only needed for the summary below
+    qa_df = table.to_pandas()
     print("\nDataFrame Info:")
     qa_df.info(verbose=True)
     print("\nFirst few rows:")
@@ -1,4 +1,5 @@
 import argparse
+import importlib
 import os
 import sys
 
@@ -6,32 +7,46 @@ ENHANCED_PATH = os.path.join(os.path.dirname(__file__), "srsRAN_5G", "srsRAN_5G"
 if ENHANCED_PATH not in sys.path:
     sys.path.insert(0, ENHANCED_PATH)
 
-from enhanced_ue_mobility_controller_v2 import main as mobility_main
-from rrc_trace_capture import RRCTraceCapture
-from enhanced_rrc_trace_analyzer import main as analyzer_main
-from enhanced_visualization_dashboard import app as dashboard_app
+
+# Each subcommand imports its module only when it runs, so e.g. "capture"
+# does not pay for matplotlib or Dash.
+def run_mobility() -> None:
+    importlib.import_module("enhanced_ue_mobility_controller_v2").main()
+
+
+def run_capture() -> None:
+    capture = importlib.import_module("rrc_trace_capture").RRCTraceCapture()
+    capture.capture_all_traces()
+
+
+def run_analyze() -> None:
+    importlib.import_module("enhanced_rrc_trace_analyzer").main()
+
+
+def run_visualize() -> None:
+    dashboard_app = importlib.import_module("enhanced_visualization_dashboard").app
+    dashboard_app.run_server(debug=False, host="0.0.0.0", port=8050)
+
+
+COMMANDS = {
+    "mobility": (run_mobility, "Run UE mobility scenarios"),
+    "capture": (run_capture, "Capture RRC traces"),
+    "analyze": (run_analyze, "Analyze captured traces"),
+    "visualize": (run_visualize, "Visualize analysis results"),
+}
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Unified entry point for mobility simulation and RRC tracing")
     subparsers = parser.add_subparsers(dest="command")
 
-    subparsers.add_parser("mobility", help="Run UE mobility scenarios")
-    subparsers.add_parser("capture", help="Capture RRC traces")
-    subparsers.add_parser("analyze", help="Analyze captured traces")
-    subparsers.add_parser("visualize", help="Visualize analysis results")
+    for name, (func, help_text) in COMMANDS.items():
+        subparsers.add_parser(name, help=help_text).set_defaults(func=func)
 
     args = parser.parse_args()
 
-    if args.command == "mobility":
-        mobility_main()
-    elif args.command == "capture":
-        capture = RRCTraceCapture()
-        capture.capture_all_traces()
-    elif args.command == "analyze":
-        analyzer_main()
-    elif args.command == "visualize":
-        dashboard_app.run_server(debug=False, host="0.0.0.0", port=8050)
+    if hasattr(args, "func"):
+        args.func()
     else:
         parser.print_help()
 
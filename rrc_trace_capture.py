@@ -10,15 +10,98 @@ import os
 import sys
 import time
 import signal
+import shutil
 import subprocess
+import tempfile
 import json
 import argparse
 import re
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import pcap
 import struct
-import binascii
-from rrc_utils import parse_rrc_log
+import mmap
+from rrc_utils import parse_rrc_log_columns
+
+try:
+    import orjson
+except ImportError:  # 可選依賴，沒有時使用標準庫 json
+    orjson = None
+
+
+# 經典 PCAP 文件頭魔數 -> (字節序, 時間戳小數部分的單位)
+PCAP_MAGIC = {
+    b'\xd4\xc3\xb2\xa1': ('<', 1e-6),
+    b'\xa1\xb2\xc3\xd4': ('>', 1e-6),
+    b'\x4d\x3c\xb2\xa1': ('<', 1e-9),
+    b'\xa1\xb2\x3c\x4d': ('>', 1e-9),
+}
+
+# RRC 消息類型標記，按優先順序排列
+RRC_MESSAGE_TYPES = (
+    (b'Setup', "RRC Setup"),
+    (b'Reconfig', "RRC Reconfiguration"),
+    (b'Handover', "Handover Command"),
+)
+
+# 需要合併的 RRC 追蹤文件後綴
+RRC_TRACE_SUFFIXES = ("_rrc.json", "_log_rrc.json")
+
+
+def iter_pcap_records(buf, marker=None):
+    """按記錄頭遍歷經典 PCAP 數據，產生 (時間戳, 數據包字節)
+
+    指定 marker 時直接在映射上查找，不含該標記的數據包不會被複製
+    """
+    byte_order, frac_unit = PCAP_MAGIC[buf[:4]]
+    record_header = struct.Struct(byte_order + 'IIII')
+    offset = 24  # 跳過全局文件頭
+    size = len(buf)
+    while offset + record_header.size <= size:
+        ts_sec, ts_frac, incl_len, _ = record_header.unpack_from(buf, offset)
+        offset += record_header.size
+        end = offset + incl_len
+        # 最後一條記錄被截斷時停止遍歷，不產生不完整的數據包
+        if end > size:
+            break
+        if marker is None or buf.find(marker, offset, end) >= 0:
+            yield ts_sec + ts_frac * frac_unit, buf[offset:end]
+        offset = end
+
+
+def check_json_container(file_path):
+    """確認文件是完整的 JSON 數組或對象（首尾非空白字節成對），
+    空文件或只寫了一半的文件會引發 ValueError"""
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                start = 0
+                end = len(data) - 1
+                while start <= end and data[start:start + 1].isspace():
+                    start += 1
+                while end > start and data[end:end + 1].isspace():
+                    end -= 1
+                if start < end and data[start:start + 1] + data[end:end + 1] in (b'[]', b'{}'):
+                    return
+    raise ValueError(f"{file_path} 不是完整的 JSON 數組或對象")
+
+
+def parse_json(data):
+    """解析 JSON 字節串，優先使用 orjson"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump_json_file(obj, file_path):
+    """以兩格縮排寫入 JSON 文件，優先使用 orjson"""
+    if orjson is not None:
+        with open(file_path, 'wb') as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+        return
+    with open(file_path, 'w') as f:
+        json.dump(obj, f, indent=2)
+
 
 class RRCTraceCapture:
     def __init__(self, output_dir="/home/ubuntu/rrc_traces"):
@@ -48,7 +131,8 @@ class RRCTraceCapture:
         print("\n接收到終止信號，正在退出...")
         sys.exit(0)
     
-    def extract_rrc_messages(self, pcap_file, output_json):
+    @staticmethod
+    def extract_rrc_messages(pcap_file, output_json):
         """從 PCAP 文件中提取 RRC 消息並轉換為 JSON 格式"""
         print(f"從 {pcap_file} 提取 RRC 消息...")
         
@@ -56,34 +140,58 @@ class RRCTraceCapture:
             print(f"錯誤: PCAP 文件 {pcap_file} 不存在")
             return False
         
-        # 使用 tshark 提取 RRC 消息
+        # 使用 tshark 提取 RRC 消息（-T ek 每行一個 JSON 對象，可邊讀邊寫）
         tshark_cmd = [
             "tshark", "-r", pcap_file,
             "-Y", "lte-rrc",
-            "-T", "json"
+            "-T", "ek"
         ]
         
+        # 先寫入臨時文件，成功後才替換為 output_json，失敗時不留下不完整的文件
+        tmp_json = output_json + '.tmp'
+        succeeded = False
         try:
-            result = subprocess.run(tshark_cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                print(f"錯誤: tshark 命令失敗: {result.stderr}")
-                return False
-            
-            # 解析 JSON 輸出
-            rrc_messages = json.loads(result.stdout)
-            
-            # 寫入 JSON 文件
-            with open(output_json, 'w') as f:
-                json.dump(rrc_messages, f, indent=2)
+            # stderr 寫入臨時文件而不是管道，避免 tshark 輸出大量警告時阻塞在 stderr 上
+            with tempfile.TemporaryFile() as stderr_file:
+                proc = subprocess.Popen(tshark_cmd, stdout=subprocess.PIPE,
+                                        stderr=stderr_file, bufsize=1 << 20)
+                
+                # 逐行解析並寫入 JSON 數組，不在內存中保留完整輸出
+                with proc, open(tmp_json, 'wb') as f:
+                    f.write(b'[')
+                    first = True
+                    for line in proc.stdout:
+                        if not line.strip():
+                            continue
+                        packet = parse_json(line)
+                        # 跳過 Elasticsearch 批量導入用的索引行
+                        if "index" in packet:
+                            continue
+                        if not first:
+                            f.write(b',\n')
+                        f.write(orjson.dumps(packet) if orjson is not None else json.dumps(packet).encode())
+                        first = False
+                    f.write(b']\n')
+                
+                if proc.returncode != 0:
+                    stderr_file.seek(0)
+                    print(f"錯誤: tshark 命令失敗: {stderr_file.read().decode(errors='replace')}")
+                    return False
             
+            os.replace(tmp_json, output_json)
+            succeeded = True
             print(f"已將 RRC 消息保存到 {output_json}")
             return True
             
         except Exception as e:
             print(f"提取 RRC 消息時發生錯誤: {e}")
             return False
+        finally:
+            if not succeeded and os.path.exists(tmp_json):
+                os.remove(tmp_json)
     
-    def parse_pcap_manually(self, pcap_file, output_json):
+    @staticmethod
+    def parse_pcap_manually(pcap_file, output_json):
         """手動解析 PCAP 文件以提取 RRC 消息"""
         print(f"手動解析 {pcap_file} 以提取 RRC 消息...")
         
@@ -92,39 +200,51 @@ class RRCTraceCapture:
             return False
         
         try:
-            # 打開 PCAP 文件
-            p = pcap.pcap(pcap_file)
-            
             rrc_messages = []
             
-            # 遍歷每個數據包
-            for timestamp, packet in p:
-                # 檢查是否為 LTE-RRC 數據包
-                # 這裡需要根據實際的數據包格式進行解析
-                # 由於 LTE-RRC 解析比較複雜，這裡只提供一個簡化的示例
+            with open(pcap_file, 'rb') as f:
+                if not os.fstat(f.fileno()).st_size:
+                    packets = None
+                else:
+                    packets = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            
+            try:
+                # 經典 PCAP 格式直接按記錄頭遍歷，其他格式（如 pcapng）交給 pypcap
+                if packets is not None and packets[:4] in PCAP_MAGIC:
+                    records = iter_pcap_records(packets, marker=b'RRC')
+                else:
+                    records = pcap.pcap(pcap_file)
+            
+                # 遍歷每個數據包
+                for timestamp, packet in records:
+                    # 檢查是否為 LTE-RRC 數據包
+                    # 這裡需要根據實際的數據包格式進行解析
+                    # 由於 LTE-RRC 解析比較複雜，這裡只提供一個簡化的示例
                 
-                # 假設 MAC LTE 數據包的特定標記
-                if b'LTE-RRC' in packet or b'RRC' in packet:
-                    # 提取 RRC 消息
-                    rrc_message = {
-                        "timestamp": timestamp,
-                        "data": binascii.hexlify(packet).decode('utf-8'),
-                        "type": "RRC"
-                    }
+                    # 假設 MAC LTE 數據包的特定標記（b'LTE-RRC' 也包含 b'RRC'）
+                    if b'RRC' in packet:
+                        # 提取 RRC 消息
+                        rrc_message = {
+                            "timestamp": timestamp,
+                            "data": packet.hex(),
+                            "type": "RRC"
+                        }
                     
-                    # 嘗試識別 RRC 消息類型
-                    if b'Setup' in packet:
-                        rrc_message["message_type"] = "RRC Setup"
-                    elif b'Reconfig' in packet:
-                        rrc_message["message_type"] = "RRC Reconfiguration"
-                    elif b'Handover' in packet:
-                        rrc_message["message_type"] = "Handover Command"
+                        # 嘗試識別 RRC 消息類型
+                        for marker, message_type in RRC_MESSAGE_TYPES:
+                            if marker in packet:
+                                rrc_message["message_type"] = message_type
+                                break
                     
-                    rrc_messages.append(rrc_message)
+                        rrc_messages.append(rrc_message)
+            
+            finally:
+                # 遍歷出錯時也要釋放映射
+                if packets is not None:
+                    packets.close()
             
             # 寫入 JSON 文件
-            with open(output_json, 'w') as f:
-                json.dump(rrc_messages, f, indent=2)
+            dump_json_file(rrc_messages, output_json)
             
             print(f"已將 RRC 消息保存到 {output_json}")
             return True
@@ -133,7 +253,17 @@ class RRCTraceCapture:
             print(f"解析 PCAP 文件時發生錯誤: {e}")
             return False
     
-    def extract_logs(self, log_file, output_json):
+    @staticmethod
+    def extract_pcap(pcap_file, output_json):
+        """從單個 PCAP 文件提取 RRC 消息"""
+        # 嘗試使用 tshark 提取 RRC 消息
+        if RRCTraceCapture.extract_rrc_messages(pcap_file, output_json):
+            return True
+        # 如果 tshark 失敗，嘗試手動解析
+        return RRCTraceCapture.parse_pcap_manually(pcap_file, output_json)
+    
+    @staticmethod
+    def extract_logs(log_file, output_json):
         """從日誌文件中提取 RRC 相關信息"""
         print(f"從 {log_file} 提取 RRC 相關信息...")
         
@@ -142,20 +272,21 @@ class RRCTraceCapture:
             return False
         
         try:
-            messages = parse_rrc_log(log_file)
+            columns = parse_rrc_log_columns(log_file)
 
             # 將解析結果轉換為更通用的格式
             rrc_logs = [
                 {
-                    "timestamp": m.get("timestamp"),
-                    "message": m.get("content"),
-                    "direction": m.get("direction")
+                    "timestamp": timestamp,
+                    "message": content,
+                    "direction": direction
                 }
-                for m in messages
+                for timestamp, direction, content in zip(
+                    columns["timestamp"], columns["direction"], columns["content"]
+                )
             ]
 
-            with open(output_json, 'w') as f:
-                json.dump(rrc_logs, f, indent=2)
+            dump_json_file(rrc_logs, output_json)
             
             print(f"已將 RRC 日誌信息保存到 {output_json}")
             return True
@@ -166,6 +297,10 @@ class RRCTraceCapture:
     
     def install_dependencies(self):
         """安裝必要的依賴項"""
+        # pypcap 已在模塊載入時導入，只需檢查 tshark 是否可用
+        if shutil.which("tshark"):
+            return True
+        
         print("安裝必要的依賴項...")
         
         try:
@@ -187,16 +322,6 @@ class RRCTraceCapture:
             print("無法安裝必要的依賴項，退出")
             return False
         
-        # 處理 PCAP 文件
-        for name, pcap_file in self.pcap_files.items():
-            if os.path.exists(pcap_file):
-                output_json = os.path.join(self.output_dir, f"{name}_rrc.json")
-                
-                # 嘗試使用 tshark 提取 RRC 消息
-                if not self.extract_rrc_messages(pcap_file, output_json):
-                    # 如果 tshark 失敗，嘗試手動解析
-                    self.parse_pcap_manually(pcap_file, output_json)
-        
         # 處理日誌文件
         log_files = [
             "/home/ubuntu/enb1.log",
@@ -206,11 +331,29 @@ class RRCTraceCapture:
             "/home/ubuntu/ue3.log"
         ]
         
+        # 各個 PCAP 和日誌文件互相獨立，收集成 (函數, 輸入文件, 輸出文件) 任務
+        tasks = []
+        for name, pcap_file in self.pcap_files.items():
+            if os.path.exists(pcap_file):
+                output_json = os.path.join(self.output_dir, f"{name}_rrc.json")
+                tasks.append((_extract_one, pcap_file, output_json))
+        
         for log_file in log_files:
             if os.path.exists(log_file):
                 base_name = os.path.basename(log_file).split('.')[0]
                 output_json = os.path.join(self.output_dir, f"{base_name}_log_rrc.json")
-                self.extract_logs(log_file, output_json)
+                tasks.append((_extract_log, log_file, output_json))
+        
+        if len(tasks) < 2:
+            # 只有一個任務時不值得啟動進程池
+            for func, input_file, output_json in tasks:
+                func(input_file, output_json)
+        else:
+            # 在多個進程中並行處理；提交的是模塊級函數，不需要序列化整個 RRCTraceCapture
+            with ProcessPoolExecutor(initializer=_init_worker) as executor:
+                futures = [executor.submit(*task) for task in tasks]
+                for future in as_completed(futures):
+                    future.result()
         
         # 合併移動事件和 RRC 追蹤
         self.merge_mobility_and_rrc()
@@ -227,37 +370,66 @@ class RRCTraceCapture:
             print(f"錯誤: 移動事件文件 {mobility_file} 不存在")
             return False
         
+        merged_file = os.path.join(self.output_dir, "merged_rrc_mobility.json")
+        tmp_file = merged_file + '.tmp'
         try:
-            # 讀取移動事件
-            with open(mobility_file, 'r') as f:
-                mobility_events = json.load(f)
-            
-            # 收集所有 RRC 追蹤
-            rrc_traces = {}
-            for filename in os.listdir(self.output_dir):
-                if filename.endswith("_rrc.json") or filename.endswith("_log_rrc.json"):
-                    file_path = os.path.join(self.output_dir, filename)
-                    with open(file_path, 'r') as f:
-                        rrc_traces[filename] = json.load(f)
-            
-            # 合併數據
-            merged_data = {
-                "mobility_events": mobility_events,
-                "rrc_traces": rrc_traces
-            }
+            # 各文件已是 JSON，直接拼接字節寫入合併文件，無需重新解析；
+            # 拼接前只檢查每個文件首尾完整，避免寫出無效的合併文件
+            check_json_container(mobility_file)
+            with os.scandir(self.output_dir) as entries:
+                trace_files = [
+                    (entry.name, entry.path) for entry in entries
+                    if entry.name.endswith(RRC_TRACE_SUFFIXES) and entry.is_file()
+                ]
+            for _, path in trace_files:
+                check_json_container(path)
             
-            # 寫入合併文件
-            merged_file = os.path.join(self.output_dir, "merged_rrc_mobility.json")
-            with open(merged_file, 'w') as f:
-                json.dump(merged_data, f, indent=2)
+            with open(tmp_file, 'wb') as out:
+                # 寫入移動事件
+                out.write(b'{"mobility_events": ')
+                with open(mobility_file, 'rb') as f:
+                    shutil.copyfileobj(f, out)
+                
+                # 寫入所有 RRC 追蹤
+                out.write(b',\n"rrc_traces": {')
+                separator = b''
+                for name, path in trace_files:
+                    out.write(separator + json.dumps(name).encode() + b': ')
+                    with open(path, 'rb') as f:
+                        shutil.copyfileobj(f, out)
+                    separator = b',\n'
+                out.write(b'}}\n')
+            os.replace(tmp_file, merged_file)
             
             print(f"已將移動事件和 RRC 追蹤合併到 {merged_file}")
             return True
             
         except Exception as e:
             print(f"合併數據時發生錯誤: {e}")
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
             return False
 
+
+def _init_worker():
+    """進程池子進程的初始化：不沿用 RRCTraceCapture 安裝的信號處理器
+
+    Ctrl-C 由父進程處理並等待子進程結束，子進程忽略 SIGINT；SIGTERM 恢復默認行為
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def _extract_one(pcap_file, output_json):
+    """進程池任務：從單個 PCAP 文件提取 RRC 消息"""
+    return RRCTraceCapture.extract_pcap(pcap_file, output_json)
+
+
+def _extract_log(log_file, output_json):
+    """進程池任務：從單個日誌文件提取 RRC 相關信息"""
+    return RRCTraceCapture.extract_logs(log_file, output_json)
+
+
 def main():
     parser = argparse.ArgumentParser(description="RRC 協議追蹤捕獲工具")
     parser.add_argument("--output-dir", default="/home/ubuntu/rrc_traces", help="輸出目錄")
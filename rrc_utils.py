@@ -1,117 +1,244 @@
+import mmap
+import os
 import re
-import pandas as pd
-from typing import List, Dict
+import numpy as np
+from typing import List, Dict, Union
+
+_RRC_HEADER = b"LTE Radio Resource Control (RRC) protocol"
+# Anchored at a line start; first timestamp within the next 9 lines.
+_EPOCH_RE = re.compile(rb"(?:[^\n]*\n){0,8}?[^\n]*?Epoch Arrival Time: (\d+\.\d+)")
+_DIR_RE = re.compile(rb"LTE RRC (UL|DL)_")
+# Anchored at a line start; first of the next 4 lines carrying a direction
+# marker. UL wins when a line has both.
+_DIR_MARKER_RE = re.compile(
+    rb"(?:[^\n]*\n){0,3}?"
+    rb"(?:(?P<ul>(?=[^\n]*(?:UL-CCCH-Message|UL-DCCH-Message|UL_CCCH|UL_DCCH)))"
+    rb"|(?=[^\n]*(?:DL-CCCH-Message|DL-DCCH-Message|DL_CCCH|DL_DCCH)))"
+)
+# Match starts at the newline preceding a blank (whitespace-only) line.
+_BLANK_LINE_RE = re.compile(rb"\n[^\S\n]*\n")
+# A carriage return that is not part of a CRLF pair ends a line in text mode.
+_LONE_CR_RE = re.compile(rb"\r(?!\n)")
+
+
+def parse_rrc_log_columns(log_file_path: str) -> Dict[str, list]:
+    """Parse a textual log into parallel timestamp/direction/content columns."""
+    columns = {"timestamp": [], "direction": [], "content": []}
+
+    # The log is mapped rather than read, so only the RRC blocks that are
+    # emitted are ever copied and decoded.
+    try:
+        with open(log_file_path, 'rb') as f:
+            if not os.fstat(f.fileno()).st_size:
+                return columns
+            text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except Exception as e:
+        print(f"Error reading log file: {e}")
+        return columns
+
+    with text:
+        if _LONE_CR_RE.search(text):
+            # The scanner splits on \n only; apply universal newlines first so
+            # logs with bare \r line endings parse as they do in text mode.
+            _scan_rrc_blocks(text[:].replace(b"\r\n", b"\n").replace(b"\r", b"\n"), columns)
+        else:
+            _scan_rrc_blocks(text, columns)
+    return columns
 
 
 def parse_rrc_log(log_file_path: str) -> List[Dict[str, str]]:
     """Parse a textual log and extract RRC messages with timestamp and direction."""
-    messages = []
+    columns = parse_rrc_log_columns(log_file_path)
+    return [
+        {"timestamp": timestamp, "direction": direction, "content": content}
+        for timestamp, direction, content in zip(
+            columns["timestamp"], columns["direction"], columns["content"]
+        )
+    ]
+
+
+def _scan_rrc_blocks(text: Union[mmap.mmap, bytes], columns: Dict[str, list]) -> None:
+    """Append the RRC messages found in the log ``text`` to ``columns``."""
+    add_timestamp = columns["timestamp"].append
+    add_direction = columns["direction"].append
+    add_content = columns["content"].append
     current_timestamp = None
     current_direction = None
-    current_content = []
-    in_rrc_block = False
+    size = len(text)
+    # Frame headers before this offset have already been applied
+    resolved = 0
+    # Scanning only moves forward, so the next hit of each token (a substring
+    # or a compiled pattern) is cached and costs one C-level pass in total.
+    cursors = {}
 
-    try:
-        with open(log_file_path, 'r') as f:
-            lines = f.readlines()
-    except Exception as e:
-        print(f"Error reading log file: {e}")
-        return []
-
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-
-        # Look for frame header with timestamp
-        if line.startswith("Frame") and "bytes" in line and i + 1 < len(lines):
-            in_rrc_block = False
-            current_content = []
-            for j in range(i + 1, min(i + 10, len(lines))):
-                if "Epoch Arrival Time:" in lines[j]:
-                    timestamp_match = re.search(r"Epoch Arrival Time: (\d+\.\d+)", lines[j])
-                    if timestamp_match:
-                        current_timestamp = float(timestamp_match.group(1))
-                        break
-        elif "LTE Radio Resource Control (RRC) protocol" in line:
-            in_rrc_block = True
-            current_content = [line]
-            for j in range(i + 1, min(i + 5, len(lines))):
-                if any(x in lines[j] for x in ["UL-CCCH-Message", "UL-DCCH-Message", "UL_CCCH", "UL_DCCH"]):
-                    current_direction = "UL"
+    def find(token, pos):
+        hit = cursors.get(token)
+        if hit is None or hit < pos:
+            if isinstance(token, bytes):
+                hit = text.find(token, pos)
+            else:
+                match = token.search(text, pos)
+                hit = match.start() if match else -1
+            if hit < 0:
+                hit = size + 1
+            cursors[token] = hit
+        return hit
+
+    def line_at(pos):
+        start = text.rfind(b"\n", 0, pos) + 1
+        end = text.find(b"\n", pos)
+        return start, size if end < 0 else end
+
+    def is_header(start, end):
+        line = text[start:end].strip()
+        if line.startswith(b"Frame") and b"bytes" in line and end + 1 < size:
+            return "frame"
+        if _RRC_HEADER in line:
+            return "rrc"
+        return None
+
+    def resolve(upto):
+        # Only the last frame header before ``upto`` that carries a timestamp
+        # matters, so frames are looked up backwards when a block needs one
+        # instead of being visited one by one.
+        nonlocal current_timestamp, resolved
+        pos = upto
+        while True:
+            hit = text.rfind(b"Frame", resolved, pos)
+            if hit < 0:
+                break
+            start, end = line_at(hit)
+            if is_header(start, end) == "frame":
+                timestamp_match = _EPOCH_RE.match(text, end + 1)
+                if timestamp_match:
+                    current_timestamp = float(timestamp_match.group(1))
                     break
-                elif any(x in lines[j] for x in ["DL-CCCH-Message", "DL-DCCH-Message", "DL_CCCH", "DL_DCCH"]):
-                    current_direction = "DL"
+            pos = start
+        resolved = upto
+
+    def emit(start, end):
+        resolve(start)
+        if current_timestamp is None or current_direction is None:
+            return
+        block = text[start:end].decode("utf-8", errors="replace")
+        if block.endswith("\n"):
+            block = block[:-1]
+        add_timestamp(current_timestamp)
+        add_direction(current_direction)
+        add_content("\n".join(map(str.strip, block.split("\n"))))
+
+    pos = 0
+    while pos < size:
+        hit = min(find(_RRC_HEADER, pos), find(b"LTE RRC", pos))
+        if hit > size:
+            break
+        start, end = line_at(hit)
+        next_line = end + 1
+        kind = is_header(start, end)
+
+        # Frame headers are applied lazily by resolve()
+        if kind == "frame":
+            pos = next_line
+        elif kind == "rrc":
+            marker = _DIR_MARKER_RE.match(text, next_line)
+            if marker:
+                current_direction = "UL" if marker.group("ul") is not None else "DL"
+            if next_line >= size:
+                emit(start, size)
+                break
+            # The line right after the header only interrupts the block when it
+            # is itself a header; blank/"No."/"Frame" lines close it from there on.
+            follow_end = line_at(next_line)[1]
+            if is_header(next_line, follow_end):
+                pos = next_line
+                continue
+            scan = follow_end + 1
+            stop = min(find(b"No.", scan), find(b"Frame", scan), find(_RRC_HEADER, scan))
+            stop = line_at(stop)[0] if stop <= size else size
+            # Blank lines are only looked for up to the next token hit.
+            blank = _BLANK_LINE_RE.search(text, scan - 1, stop)
+            if blank:
+                stop = blank.start() + 1
+            elif stop == size:
+                tail = text.rfind(b"\n") + 1
+                if tail < scan or text[tail:].strip():
+                    emit(start, size)
                     break
-        elif in_rrc_block:
-            current_content.append(line)
-            if i + 1 < len(lines) and (lines[i + 1].strip() == "" or "No." in lines[i + 1] or "Frame" in lines[i + 1]):
-                if current_timestamp is not None and current_direction is not None:
-                    messages.append({
-                        "timestamp": current_timestamp,
-                        "direction": current_direction,
-                        "content": "\n".join(current_content)
-                    })
-                in_rrc_block = False
-        elif "LTE RRC" in line and "Info" in line:
-            protocol_match = re.search(r"LTE RRC (UL|DL)_", line)
+                stop = tail
+            line = text[stop:line_at(stop)[1]]
+            if not line.strip() or b"No." in line or b"Frame" in line:
+                emit(start, stop)
+            pos = stop
+        else:
+            line = text[start:end]
+            protocol_match = _DIR_RE.search(line) if b"LTE RRC" in line and b"Info" in line else None
+            pos = next_line
             if protocol_match:
-                current_direction = protocol_match.group(1)
-                j = i + 1
-                while j < len(lines) and "LTE Radio Resource Control (RRC) protocol" not in lines[j]:
-                    j += 1
-                if j < len(lines):
-                    i = j - 1
-        i += 1
+                current_direction = protocol_match.group(1).decode()
+                header = find(_RRC_HEADER, next_line)
+                if header <= size:
+                    # Frame headers in the skipped lines are never applied
+                    resolve(next_line)
+                    pos = resolved = line_at(header)[0]
 
-    if in_rrc_block and current_timestamp is not None and current_direction is not None:
-        messages.append({
-            "timestamp": current_timestamp,
-            "direction": current_direction,
-            "content": "\n".join(current_content)
-        })
 
-    return messages
+def build_qa_columns(messages: List[Dict[str, str]]) -> Dict[str, list]:
+    """Group consecutive messages and return the Q/A pairs as column lists."""
+    return group_qa_columns({
+        "timestamp": [m["timestamp"] for m in messages],
+        "direction": [m["direction"] for m in messages],
+        "content": [m["content"] for m in messages]
+    })
 
 
-def create_qa_dataset(messages: List[Dict[str, str]]) -> pd.DataFrame:
-    """Group consecutive messages and create Q/A pairs."""
-    if not messages:
-        return pd.DataFrame(columns=["Q_Timestamp", "Q_Content", "A_Timestamp", "A_Content"])
-
-    messages.sort(key=lambda x: x["timestamp"])
-    grouped_messages = []
-    current_group = {
-        "timestamp": messages[0]["timestamp"],
-        "direction": messages[0]["direction"],
-        "content": [messages[0]["content"]]
+def group_qa_columns(log_columns: Dict[str, list]) -> Dict[str, list]:
+    """Group consecutive messages given as parallel columns into Q/A pairs."""
+    q_ts = []
+    q_content = []
+    a_ts = []
+    a_content = []
+    columns = {
+        "Q_Timestamp": q_ts,
+        "Q_Content": q_content,
+        "A_Timestamp": a_ts,
+        "A_Content": a_content
     }
+    count = len(log_columns["timestamp"])
+    if not count:
+        return columns
 
-    for i in range(1, len(messages)):
-        if messages[i]["direction"] == current_group["direction"]:
-            current_group["content"].append(messages[i]["content"])
-        else:
-            current_group["content"] = "\n---\n".join(current_group["content"])
-            grouped_messages.append(current_group)
-            current_group = {
-                "timestamp": messages[i]["timestamp"],
-                "direction": messages[i]["direction"],
-                "content": [messages[i]["content"]]
-            }
-    current_group["content"] = "\n---\n".join(current_group["content"])
-    grouped_messages.append(current_group)
-
-    qa_pairs = []
-    i = 0
-    while i < len(grouped_messages) - 1:
-        if grouped_messages[i]["direction"] == "UL" and grouped_messages[i + 1]["direction"] == "DL":
-            qa_pairs.append({
-                "Q_Timestamp": grouped_messages[i]["timestamp"],
-                "Q_Content": grouped_messages[i]["content"],
-                "A_Timestamp": grouped_messages[i + 1]["timestamp"],
-                "A_Content": grouped_messages[i + 1]["content"]
-            })
-            i += 2
-        else:
-            i += 1
+    timestamps = np.asarray(log_columns["timestamp"], dtype=np.float64)
+    dirs = (np.asarray(log_columns["direction"]) == "DL").astype(np.int8)
+    contents = log_columns["content"]
+    # Logs are normally already in time order, so only reorder when needed.
+    # A stable sort keeps same-timestamp messages in log order.
+    if (np.diff(timestamps) < 0).any():
+        order = np.argsort(timestamps, kind="stable")
+        timestamps = timestamps[order]
+        dirs = dirs[order]
+        contents = [contents[i] for i in order.tolist()]
+
+    # Runs of same-direction messages, found from where the direction flips
+    bounds = np.flatnonzero(np.diff(dirs)) + 1
+    starts = np.concatenate(([0], bounds))
+    ends = np.concatenate((bounds, [count]))
+
+    # Runs alternate in direction, so every UL run followed by another run
+    # pairs with that (DL) run
+    q_runs = np.flatnonzero(dirs[starts[:-1]] == 0)
+    a_runs = q_runs + 1
+    for runs, ts_column, content_column in ((q_runs, q_ts, q_content), (a_runs, a_ts, a_content)):
+        ts_column.extend(timestamps[starts[runs]].tolist())
+        content_column.extend(
+            "\n---\n".join(contents[start:end])
+            for start, end in zip(starts[runs].tolist(), ends[runs].tolist())
+        )
 
-    return pd.DataFrame(qa_pairs)
+    return columns
+
+
+def create_qa_dataset(messages: List[Dict[str, str]]) -> "pd.DataFrame":
+    """Group consecutive messages and create Q/A pairs."""
+    # pandas is only needed here; the parquet export works from the columns
+    import pandas as pd
+    return pd.DataFrame(build_qa_columns(messages))
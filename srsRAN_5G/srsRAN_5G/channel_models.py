@@ -3,72 +3,372 @@
 Common channel model definitions including a basic path loss implementation and a placeholder for external simulators.
 """
 import math
-import random
-from abc import ABC, abstractmethod
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # optional, coverage_pairs then checks every gNB/UE pair
+    cKDTree = None
+
+# 10 ** (x / 10) == exp(x * ln(10) / 10), which skips the generic pow path
+_LN10_OVER_10 = math.log(10) / 10
+# Thermal noise of -100 dBm, in mW
+NOISE_POWER_LINEAR = math.exp(-100 * _LN10_OVER_10)
+# The batched paths need well under 0.1 dB of precision, so they run in single precision
+BATCH_DTYPE = np.float32
+# UEs per thread below which sinr_batch stays single-threaded
+PARALLEL_BLOCK_UES = 16384
 
 class Position:
     """Represents a position in a 2D plane."""
+    __slots__ = ('x', 'y')
+
     def __init__(self, x=0, y=0):
         self.x = x
         self.y = y
 
+    @property
+    def xy(self):
+        """Return the position as an (x, y) tuple."""
+        return (self.x, self.y)
+
     def distance_to(self, other):
         """Return the Euclidean distance to another position."""
-        return math.sqrt((self.x - other.x) ** 2 + (self.y - other.y) ** 2)
+        return math.hypot(self.x - other.x, self.y - other.y)
+
+    @classmethod
+    def from_row(cls, xy, index):
+        """Return a position that reads and writes row ``index`` of an (N, 2) array in place."""
+        return ArrayPosition(xy, index)
 
     def __str__(self):
         return f"({self.x:.2f}, {self.y:.2f})"
 
 
-class ChannelModel(ABC):
-    """Abstract base class for channel models."""
+class ArrayPosition(Position):
+    """A position stored as one row of a shared (N, 2) coordinate array."""
+    __slots__ = ('_row',)
+
+    def __init__(self, xy, index):
+        self._row = xy[index]
+
+    # item() hands back a plain float, so scalar arithmetic on x/y stays off the numpy path
+    @property
+    def x(self):
+        return self._row.item(0)
+
+    @x.setter
+    def x(self, value):
+        self._row[0] = value
+
+    @property
+    def y(self):
+        return self._row.item(1)
+
+    @y.setter
+    def y(self, value):
+        self._row[1] = value
+
+
+def path_loss_constant(gnb):
+    """Return the frequency dependent pathloss term ``32.4 + 20*log10(f)`` of a gNB."""
+    constant = getattr(gnb, "path_loss_constant", None)
+    if constant is None:
+        constant = 32.4 + 20 * math.log10(gnb.frequency)
+    return constant
+
+
+def linear_gain(gnb):
+    """Return the transmit power of a gNB in mW divided by its linear frequency pathloss term."""
+    power_linear = getattr(gnb, "power_linear", None)
+    if power_linear is None:
+        power_linear = math.exp(gnb.power * _LN10_OVER_10)
+    path_loss_linear = getattr(gnb, "path_loss_linear", None)
+    if path_loss_linear is None:
+        path_loss_linear = math.exp(path_loss_constant(gnb) * _LN10_OVER_10)
+    return power_linear / path_loss_linear
+
+
+def make_rsrp(gnb):
+    """Return an ``rsrp(ue_xy, fading)`` function for one gNB with its constants folded in.
+
+    Position, power and frequency are read once, so the function goes stale
+    if the gNB is moved or reconfigured; build a new one then.
+    """
+    # power - (32.4 + 20*log10(f)) - 20*log10(d_km) == offset - 10*log10(d_m ** 2)
+    offset = BATCH_DTYPE(gnb.power - path_loss_constant(gnb) + 60)
+    x0 = BATCH_DTYPE(gnb.position.x)
+    y0 = BATCH_DTYPE(gnb.position.y)
+
+    def rsrp(ue_xy, fading):
+        ue_xy = np.asarray(ue_xy, dtype=BATCH_DTYPE)
+        dx = np.subtract(ue_xy[:, 0], x0)
+        dy = np.subtract(ue_xy[:, 1], y0)
+        dx *= dx
+        dy *= dy
+        result = np.add(dx, dy, out=dx)
+        # Distances under 1 m are clamped to 1 m
+        np.maximum(result, 1, out=result)
+        np.log10(result, out=result)
+        result *= -10
+        result += offset
+        result -= fading
+        return result
+
+    return rsrp
+
+
+def serving_gnb(rsrp_matrix, threshold=None):
+    """Return, for every UE column of a (G, N) RSRP matrix, the index of the strongest gNB.
+
+    With a threshold, UEs whose best RSRP falls below it get -1.
+    """
+    rsrp_matrix = np.asarray(rsrp_matrix)
+    best = np.argmax(rsrp_matrix, axis=0)
+    if threshold is not None:
+        best_rsrp = np.take_along_axis(rsrp_matrix, best[np.newaxis], axis=0)[0]
+        best[best_rsrp < threshold] = -1
+    return best
+
+
+def sinr_batch(gnb_xy, gnb_gain, ue_xy, fading):
+    """Return the SINR (dB) of every UE from every gNB, the others interfering, as a (G, N) array.
+
+    ``gnb_gain`` holds each gNB's ``linear_gain`` and ``fading`` the (G, N)
+    fading in dB. Every step is a whole-array NumPy ufunc, so the exp/log10
+    calls run in NumPy's SIMD loops. Large UE sets are split into column
+    blocks computed on a thread pool, as NumPy releases the GIL in the ufuncs.
+    """
+    gnb_xy = np.asarray(gnb_xy, dtype=BATCH_DTYPE)
+    gnb_gain = np.asarray(gnb_gain, dtype=BATCH_DTYPE)
+    ue_xy = np.asarray(ue_xy, dtype=BATCH_DTYPE)
+    count = len(ue_xy)
+    workers = min(os.cpu_count() or 1, count // PARALLEL_BLOCK_UES)
+    if workers <= 1:
+        return _sinr_block(gnb_xy, gnb_gain, ue_xy, fading)
+
+    # A UE's SINR only depends on its own column, so columns split cleanly
+    sinr = np.empty((len(gnb_xy), count), dtype=BATCH_DTYPE)
+    bounds = np.linspace(0, count, workers + 1).astype(int).tolist()
+
+    def run(start, end):
+        sinr[:, start:end] = _sinr_block(gnb_xy, gnb_gain, ue_xy[start:end], fading[:, start:end])
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(run, bounds[:-1], bounds[1:]))
+    return sinr
+
+
+def _sinr_block(gnb_xy, gnb_gain, ue_xy, fading):
+    dx = np.subtract(gnb_xy[:, 0:1], ue_xy[:, 0])
+    dy = np.subtract(gnb_xy[:, 1:2], ue_xy[:, 1])
+    dx *= dx
+    dy *= dy
+    # Free-space pathloss grows with the squared distance, so no sqrt is needed
+    distance_km_sq = np.add(dx, dy, out=dx)
+    distance_km_sq *= 1e-6
+    np.maximum(distance_km_sq, 1e-6, out=distance_km_sq)
+    rsrp_linear = np.multiply(fading, -_LN10_OVER_10, out=dy)
+    np.exp(rsrp_linear, out=rsrp_linear)
+    rsrp_linear *= gnb_gain[:, np.newaxis]
+    rsrp_linear /= distance_km_sq
+    # Everything received from the other gNBs, plus noise, is interference
+    sinr = np.subtract(rsrp_linear.sum(axis=0, keepdims=True), rsrp_linear, out=distance_km_sq)
+    sinr += NOISE_POWER_LINEAR
+    np.divide(rsrp_linear, sinr, out=sinr)
+    # Single precision underflows to zero much sooner, keep log10 finite
+    np.maximum(sinr, BATCH_DTYPE(1e-30), out=sinr)
+    np.log10(sinr, out=sinr)
+    sinr *= 10
+    return sinr
+
+
+class ChannelModel:
+    """Base class for channel models.
+
+    A plain class rather than an ABC, so calls on the per-UE hot path skip the
+    abstract-method machinery; subclasses must override the scalar methods.
+    """
+    __slots__ = ()
 
-    @abstractmethod
     def calculate_rsrp(self, gnb, ue_position):
         """Calculate RSRP of a UE relative to a gNB."""
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def calculate_sinr(self, gnb, ue_position, interfering_gnbs):
         """Calculate SINR of a UE relative to a gNB."""
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def is_in_coverage(self, gnb, ue_position, threshold=-110):
         """Check whether the UE is within gNB coverage."""
-        pass
+        raise NotImplementedError
+
+    def refresh_fading(self, shape):
+        """Prepare the fading for the next (G, N) matrix evaluation; a no-op unless overridden."""
+
+    def calculate_rsrp_batch(self, gnb, ue_xy):
+        """Calculate RSRP of many UEs, given as an (N, 2) array of positions, relative to a gNB."""
+        return np.array([self.calculate_rsrp(gnb, Position(x, y)) for x, y in np.asarray(ue_xy)], dtype=float)
+
+    def is_in_coverage_batch(self, gnb, ue_xy, threshold=-110):
+        """Return a boolean mask of the UEs, given as an (N, 2) array of positions, covered by a gNB."""
+        return self.calculate_rsrp_batch(gnb, ue_xy) >= threshold
+
+    def calculate_rsrp_matrix(self, gnbs, ue_xy):
+        """Calculate RSRP of every UE relative to every gNB as a (G, N) array."""
+        return np.array([self.calculate_rsrp_batch(gnb, ue_xy) for gnb in gnbs], dtype=float)
+
+    def calculate_sinr_matrix(self, gnbs, ue_xy):
+        """Calculate SINR of every UE relative to every gNB, the others interfering, as a (G, N) array."""
+        positions = [Position(x, y) for x, y in np.asarray(ue_xy)]
+        return np.array(
+            [[self.calculate_sinr(gnb, position, gnbs) for position in positions] for gnb in gnbs],
+            dtype=float,
+        )
 
 
 class SimplifiedChannelModel(ChannelModel):
     """Simple pathloss based channel model with random fading."""
+    __slots__ = ('_rng', '_fading', '_fading_samples', '_gnb_tree', '_gnb_tree_xy')
+
+    # Number of fading samples drawn at once for the scalar methods
+    FADING_SAMPLES = 4096
+
+    def __init__(self, seed=None):
+        self._rng = np.random.default_rng(seed)
+        self._fading = None
+        self._fading_samples = []
+        self._gnb_tree = None
+        self._gnb_tree_xy = None
+
+    def refresh_fading(self, shape):
+        """Draw the fading (dB) used by the next (G, N) matrix evaluation.
+
+        The buffer is consumed by that one evaluation; later ones draw afresh
+        until this is called again, so fading never freezes between ticks.
+        """
+        self._fading = self._draw_fading(shape)
+
+    def _draw_fading(self, shape):
+        # Uniform fading in [0, 5) dB
+        fading = self._rng.random(shape, dtype=BATCH_DTYPE)
+        fading *= 5
+        return fading
+
+    def _fading_matrix(self, shape):
+        fading = self._fading
+        self._fading = None
+        if fading is None or fading.shape != tuple(shape):
+            return self._draw_fading(shape)
+        return fading
+
+    def _next_fading(self):
+        if not self._fading_samples:
+            self._fading_samples = self._draw_fading(self.FADING_SAMPLES).tolist()
+        return self._fading_samples.pop()
 
     def calculate_rsrp(self, gnb, ue_position):
         distance_km = gnb.position.distance_to(ue_position) / 1000.0
         if distance_km < 0.001:
             distance_km = 0.001
-        try:
-            path_loss = 32.4 + 20 * math.log10(gnb.frequency) + 20 * math.log10(distance_km)
-        except ValueError:
-            return -float("inf")
-        fading = random.uniform(0, 5)
+        # The clamp above keeps log10 in its domain
+        path_loss = path_loss_constant(gnb) + 20 * math.log10(distance_km)
+        fading = self._next_fading()
         return gnb.power - path_loss - fading
 
+    def calculate_rsrp_batch(self, gnb, ue_xy):
+        return make_rsrp(gnb)(ue_xy, self._draw_fading(len(ue_xy)))
+
+    def calculate_rsrp_matrix(self, gnbs, ue_xy):
+        ue_xy = np.asarray(ue_xy, dtype=BATCH_DTYPE)
+        gnb_xy = np.array([gnb.position.xy for gnb in gnbs], dtype=BATCH_DTYPE).reshape(-1, 2)
+        constant = np.array([path_loss_constant(gnb) for gnb in gnbs], dtype=BATCH_DTYPE)[:, np.newaxis]
+        power = np.array([gnb.power for gnb in gnbs], dtype=BATCH_DTYPE)[:, np.newaxis]
+        # (G, 1) against (N,) broadcasts to one (G, N) distance matrix
+        distance_km = np.hypot(gnb_xy[:, 0:1] - ue_xy[:, 0], gnb_xy[:, 1:2] - ue_xy[:, 1])
+        distance_km /= 1000.0
+        np.maximum(distance_km, 0.001, out=distance_km)
+        # Path loss is built up in place to avoid temporaries
+        path_loss = np.log10(distance_km, out=distance_km)
+        path_loss *= 20
+        path_loss += constant
+        path_loss += self._fading_matrix(path_loss.shape)
+        return np.subtract(power, path_loss, out=path_loss)
+
+    def _rsrp_linear(self, gnb, ue_position):
+        """Return the received power in mW, without going through dB."""
+        dx = gnb.position.x - ue_position.x
+        dy = gnb.position.y - ue_position.y
+        # Free-space pathloss grows with the squared distance, so no sqrt is needed
+        distance_km_sq = (dx * dx + dy * dy) * 1e-6
+        if distance_km_sq < 1e-6:
+            distance_km_sq = 1e-6
+        fading_linear = math.exp(-self._next_fading() * _LN10_OVER_10)
+        return linear_gain(gnb) / distance_km_sq * fading_linear
+
+    def calculate_sinr_matrix(self, gnbs, ue_xy):
+        ue_xy = np.asarray(ue_xy, dtype=BATCH_DTYPE)
+        gnb_xy = np.array([gnb.position.xy for gnb in gnbs], dtype=BATCH_DTYPE).reshape(-1, 2)
+        gain = np.array([linear_gain(gnb) for gnb in gnbs], dtype=BATCH_DTYPE)
+        fading = self._fading_matrix((len(gain), len(ue_xy)))
+        return sinr_batch(gnb_xy, gain, ue_xy, fading)
+
+    def coverage_pairs(self, gnbs, ue_xy, threshold=-110):
+        """Return the (gNB index, UE index, RSRP) arrays of the pairs with RSRP at or above ``threshold``.
+
+        Fading only lowers RSRP, so each gNB has a fixed range beyond which it
+        cannot cover a UE; only pairs within that range are evaluated.
+        """
+        ue_xy = np.asarray(ue_xy, dtype=float).reshape(-1, 2)
+        gnb_xy = np.array([gnb.position.xy for gnb in gnbs], dtype=float).reshape(-1, 2)
+        constant = np.array([path_loss_constant(gnb) for gnb in gnbs], dtype=float)
+        power = np.array([gnb.power for gnb in gnbs], dtype=float)
+        # Distance (m) at which the fading-free RSRP drops to the threshold
+        reach = 1000.0 * 10 ** ((power - constant - threshold) / 20.0)
+        if not len(gnb_xy) or not len(ue_xy):
+            gnb_index = ue_index = np.empty(0, dtype=np.intp)
+            distance = np.empty(0)
+        elif cKDTree is not None:
+            # gNBs do not move, so their tree is kept between calls
+            if self._gnb_tree is None or not np.array_equal(self._gnb_tree_xy, gnb_xy):
+                self._gnb_tree = cKDTree(gnb_xy)
+                self._gnb_tree_xy = gnb_xy
+            pairs = self._gnb_tree.sparse_distance_matrix(
+                cKDTree(ue_xy), reach.max(), output_type="ndarray"
+            )
+            gnb_index = pairs["i"].astype(np.intp)
+            ue_index = pairs["j"].astype(np.intp)
+            distance = pairs["v"]
+        else:
+            distance = np.hypot(gnb_xy[:, 0:1] - ue_xy[:, 0], gnb_xy[:, 1:2] - ue_xy[:, 1])
+            gnb_index, ue_index = np.nonzero(distance <= reach[:, np.newaxis])
+            distance = distance[gnb_index, ue_index]
+        # The tree query used the largest range; trim to each gNB's own
+        keep = distance <= reach[gnb_index]
+        gnb_index = gnb_index[keep]
+        ue_index = ue_index[keep]
+        distance_km = np.maximum(distance[keep] / 1000.0, 0.001)
+        rsrp = power[gnb_index] - constant[gnb_index] - 20 * np.log10(distance_km)
+        rsrp -= self._draw_fading(len(rsrp))
+        covered = rsrp >= threshold
+        return gnb_index[covered], ue_index[covered], rsrp[covered]
+
     def calculate_sinr(self, gnb, ue_position, interfering_gnbs):
-        signal_power_linear = 10 ** (self.calculate_rsrp(gnb, ue_position) / 10.0)
+        signal_power_linear = self._rsrp_linear(gnb, ue_position)
         interference_power_linear = 0.0
         for interfering_gnb in interfering_gnbs:
             if interfering_gnb != gnb:
-                interference_power_linear += 10 ** (
-                    self.calculate_rsrp(interfering_gnb, ue_position) / 10.0
-                )
-        noise_power_linear = 10 ** (-100 / 10.0)
+                interference_power_linear += self._rsrp_linear(interfering_gnb, ue_position)
+        noise_power_linear = NOISE_POWER_LINEAR
         if interference_power_linear + noise_power_linear == 0:
             return float("inf")
         sinr_linear = signal_power_linear / (interference_power_linear + noise_power_linear)
-        try:
-            return 10 * math.log10(sinr_linear)
-        except ValueError:
+        if sinr_linear <= 0:
             return -float("inf")
+        return 10 * math.log10(sinr_linear)
 
     def is_in_coverage(self, gnb, ue_position, threshold=-110):
         rsrp = self.calculate_rsrp(gnb, ue_position)
@@ -77,27 +377,21 @@ class SimplifiedChannelModel(ChannelModel):
 
 class ExternalChannelModelPlaceholder(ChannelModel):
     """Placeholder for integration with an external channel simulator."""
+    __slots__ = ('api', '_fallback')
 
     def __init__(self, external_simulator_api=None):
         self.api = external_simulator_api
+        # Until the external simulator is wired in, every call is answered by one shared model
+        self._fallback = SimplifiedChannelModel()
         print(
             "Using External Channel Model Placeholder. Implement integration with your simulator."
         )
 
     def calculate_rsrp(self, gnb, ue_position):
-        if self.api:
-            pass
-        simplified_model = SimplifiedChannelModel()
-        return simplified_model.calculate_rsrp(gnb, ue_position)
+        return self._fallback.calculate_rsrp(gnb, ue_position)
 
     def calculate_sinr(self, gnb, ue_position, interfering_gnbs):
-        if self.api:
-            pass
-        simplified_model = SimplifiedChannelModel()
-        return simplified_model.calculate_sinr(gnb, ue_position, interfering_gnbs)
+        return self._fallback.calculate_sinr(gnb, ue_position, interfering_gnbs)
 
     def is_in_coverage(self, gnb, ue_position, threshold=-110):
-        if self.api:
-            pass
-        simplified_model = SimplifiedChannelModel()
-        return simplified_model.is_in_coverage(gnb, ue_position, threshold)
+        return self._fallback.is_in_coverage(gnb, ue_position, threshold)
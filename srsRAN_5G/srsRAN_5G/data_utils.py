@@ -5,31 +5,63 @@ Utility helpers for loading JSON and CSV files.
 
 import json
 import os
+from functools import lru_cache
+
 import pandas as pd
 
+try:
+    import orjson
+except ImportError:  # optional, the standard library parser is used instead
+    orjson = None
+
+
+@lru_cache(maxsize=128)
+def _load_json_file(file_path, mtime):
+    # The modification time is part of the key, so a rewritten file is parsed again
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 
 def load_json_data(file_path):
-    """Load JSON data from a file if it exists."""
-    if os.path.exists(file_path):
-        try:
-            with open(file_path, 'r') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            print(f"Error decoding JSON from {file_path}")
-        except Exception as e:
-            print(f"Error loading {file_path}: {e}")
-    else:
+    """Load JSON data from a file if it exists.
+
+    Results are cached per file and modification time, so callers share the
+    returned object and must not modify it.
+    """
+    try:
+        return _load_json_file(file_path, os.stat(file_path).st_mtime_ns)
+    except FileNotFoundError:
         print(f"Warning: File not found - {file_path}")
+    except json.JSONDecodeError:
+        print(f"Error decoding JSON from {file_path}")
+    except Exception as e:
+        print(f"Error loading {file_path}: {e}")
     return None
 
 
-def load_csv_data(file_path):
-    """Load CSV data from a file if it exists."""
-    if os.path.exists(file_path):
+def load_csv_data(file_path, dtype=None):
+    """Load CSV data from a file if it exists.
+
+    ``dtype`` is passed on to ``pd.read_csv`` so callers can skip type inference.
+    """
+    try:
         try:
-            return pd.read_csv(file_path)
-        except Exception as e:
-            print(f"Error loading {file_path}: {e}")
-    else:
+            return pd.read_csv(file_path, engine='pyarrow', dtype=dtype)
+        except (ImportError, ValueError):
+            # pyarrow is optional, and stricter than the C parser about malformed rows
+            return pd.read_csv(file_path, dtype=dtype)
+    except FileNotFoundError:
         print(f"Warning: File not found - {file_path}")
+    except Exception as e:
+        print(f"Error loading {file_path}: {e}")
     return None
+
+
+def parse_timestamp_column(df, column='Timestamp'):
+    """Convert a timestamp column to datetime in place; unparsable values become NaT."""
+    if df is not None and column in df.columns:
+        df[column] = pd.to_datetime(df[column], errors='coerce', cache=True)
+    return df
@@ -8,17 +8,367 @@ import os
 import sys
 import json
 import argparse
+import array
 import subprocess
 import re
 import csv
+import mmap
 import datetime
 import time
 import threading
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from collections import defaultdict, Counter, deque
-from itertools import groupby
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import compress, groupby, repeat
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:  # optional, logs are then parsed line by line
+    pa = pc = pa_csv = None
+
+try:
+    import orjson
+except ImportError:  # 可選依賴，沒有時使用標準庫 json
+    orjson = None
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+TIMESTAMP_PATTERN = r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+'
+# 日誌內容只含 ASCII 數字，str 正則使用 re.ASCII 跳過 Unicode 字符類表
+TIMESTAMP_RE = re.compile(f'({TIMESTAMP_PATTERN})', re.ASCII)
+TIMESTAMP_BYTES_RE = re.compile(f'({TIMESTAMP_PATTERN})'.encode())
+
+# 從日誌文件名中提取 UE ID / gNB ID
+UE_FILE_RE = re.compile(r'ue(\d+)', re.ASCII)
+GNB_FILE_RE = re.compile(r'gnb(\d+)', re.ASCII)
+
+# 切換事件中的源小區、目標小區和切換延遲（命名組同時用於 Arrow 的 extract_regex）
+HANDOVER_SOURCE_RE = re.compile(r'from (?:cell|PCI) (?P<value>\d+)', re.ASCII)
+HANDOVER_TARGET_RE = re.compile(r'to (?:cell|PCI) (?P<value>\d+)', re.ASCII)
+HANDOVER_DELAY_RE = re.compile(r'delay[:\s=]+(?P<value>\d+\.?\d*)', re.ASCII)
+
+# 切換事件的字段，按此順序列式存儲
+HANDOVER_EVENT_FIELDS = (
+    'timestamp', 'entity_id', 'source_cell', 'target_cell', 'type', 'delay', 'is_failure', 'is_ping_pong'
+)
+
+# 指標定義：(名稱, 關鍵字部分, 數值部分, 轉換函數)
+RADIO_METRICS = (
+    ('rsrp', r'RSRP[: =]+', r'-?\d+(?:\.\d+)?', float),
+    ('rsrq', r'RSRQ[: =]+', r'-?\d+(?:\.\d+)?', float),
+    ('sinr', r'SINR[: =]+', r'-?\d+(?:\.\d+)?', float),
+    ('cqi', r'CQI[: =]+', r'\d+', int),
+    ('mcs', r'MCS[: =]+', r'\d+', int),
+    ('bler', r'BLER[: =]+', r'\d+(?:\.\d+)?', float),
+)
+# 含有指標的行必定包含其中一個子字符串
+RADIO_KEYWORDS = ('RSR', 'SINR', 'CQI', 'MCS', 'BLER')
+
+MAC_METRICS = (
+    ('dl_throughput', r'DL[_\s]throughput[:\s=]+', r'\d+(?:\.\d+)?', float),
+    ('ul_throughput', r'UL[_\s]throughput[:\s=]+', r'\d+(?:\.\d+)?', float),
+    ('dl_latency', r'DL[_\s]latency[:\s=]+', r'\d+(?:\.\d+)?', float),
+    ('ul_latency', r'UL[_\s]latency[:\s=]+', r'\d+(?:\.\d+)?', float),
+    ('harq_retx', r'HARQ[_\s]retx[:\s=]+', r'\d+', int),
+    ('dl_mcs', r'DL[_\s]MCS[:\s=]+', r'\d+', int),
+    ('ul_mcs', r'UL[_\s]MCS[:\s=]+', r'\d+', int),
+    ('dl_rb_utilization', r'DL[_\s]RB[_\s]utilization[:\s=]+', r'\d+(?:\.\d+)?', float),
+    ('ul_rb_utilization', r'UL[_\s]RB[_\s]utilization[:\s=]+', r'\d+(?:\.\d+)?', float),
+)
+MAC_KEYWORDS = ('throughput', 'latency', 'MCS', 'utilization', 'HARQ')
+
+# 指標值按轉換函數存入 array.array：每個樣本 8 字節，可零拷貝轉為 NumPy 數組
+METRIC_TYPECODES = {float: 'd', int: 'q'}
+
+
+def _metric_patterns(metrics):
+    """每個指標一個字節正則，捕獲組為數值部分"""
+    return tuple(re.compile(f'{key}({value})'.encode()) for _, key, value, _ in metrics)
+
+
+RADIO_METRIC_PATTERNS = _metric_patterns(RADIO_METRICS)
+MAC_METRIC_PATTERNS = _metric_patterns(MAC_METRICS)
+
+
+def _extract_log_metrics(log_file, metrics, keywords, patterns):
+    """從一個日誌文件中提取指標，返回 {指標名稱: (數值列表, 時間戳列表)}"""
+    if pa_csv is not None:
+        try:
+            return _extract_log_metrics_arrow(log_file, metrics, keywords)
+        except pa.ArrowInvalid:
+            # 空文件、行內含分隔符或數值溢出等情況改用純 Python 解析
+            pass
+    return _extract_log_metrics_buffer(log_file, metrics, patterns)
+
+
+def _map_log_files(extract, log_files, *args):
+    """對每個日誌文件調用 extract(log_file, *args)，結果順序與 log_files 相同"""
+    args = (log_files, *map(repeat, args))
+    workers = min(len(log_files), os.cpu_count() or 1)
+    if workers < 2:
+        return list(map(extract, *args))
+    # 各個日誌文件互相獨立，在多個進程中並行解析
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(extract, *args))
+
+
+def _read_log_lines_arrow(log_file):
+    """整個文件作為一列字符串讀入，每行一個元素（空行被跳過）"""
+    table = pa_csv.read_csv(
+        log_file,
+        read_options=pa_csv.ReadOptions(column_names=['line']),
+        parse_options=pa_csv.ParseOptions(
+            delimiter='\x1f', quote_char=False, escape_char=False, newlines_in_values=False
+        ),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={'line': pa.string()}, null_values=[], strings_can_be_null=False
+        ),
+    )
+    return table.column('line')
+
+
+def _extract_log_metrics_arrow(log_file, metrics, keywords):
+    """過濾和正則提取都在 Arrow 的原生內核中完成"""
+    lines = _read_log_lines_arrow(log_file)
+    lines = lines.filter(pc.match_substring_regex(lines, '|'.join(map(re.escape, keywords))))
+    # extract_regex 與 re.search 一樣只取每行第一個匹配
+    timestamps = pc.struct_field(pc.extract_regex(lines, f'(?P<timestamp>{TIMESTAMP_PATTERN})'), 'timestamp')
+    has_timestamp = timestamps.is_valid()
+    lines = lines.filter(has_timestamp)
+    # 每行的時間戳字符串只創建一次，同一行的各個指標共用同一個對象
+    timestamps = timestamps.filter(has_timestamp).to_pylist()
+
+    results = {}
+    for name, key, value, convert in metrics:
+        values = pc.struct_field(pc.extract_regex(lines, f'{key}(?P<value>{value})'), 'value')
+        found = values.is_valid()
+        values = values.filter(found).cast(pa.float64() if convert is float else pa.int64())
+        buffer = array.array(METRIC_TYPECODES[convert])
+        buffer.frombytes(memoryview(values.to_numpy()).cast('B'))
+        rows = np.flatnonzero(found.to_numpy(zero_copy_only=False)).tolist()
+        results[name] = (buffer, list(map(timestamps.__getitem__, rows)))
+    return results
+
+
+def _extract_log_metrics_buffer(log_file, metrics, patterns):
+    """在映射的整個文件上解析指標，pyarrow 不可用時使用"""
+    results = {name: (array.array(METRIC_TYPECODES[convert]), []) for name, _, _, convert in metrics}
+    
+    with open(log_file, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return results
+        # 映射而不是讀入文件，直接在字節上匹配，只有時間戳需要解碼
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as text:
+            # 所有換行位置（與文本模式的通用換行一致，\r 也算），用於把匹配位置換算成行號
+            data = np.frombuffer(text, dtype=np.uint8)
+            breaks = np.flatnonzero((data == 10) | (data == 13))
+            del data
+            
+            break_list = breaks.tolist()
+            size = len(text)
+            line_timestamps = {}
+            for (name, _, _, convert), pattern in zip(metrics, patterns):
+                # 每個指標對整個文件只做一次 C 層掃描，不再逐行調用正則
+                matches = [(match.start(), match.end(), match.group(1)) for match in pattern.finditer(text)]
+                if not matches:
+                    continue
+                starts, ends, raw_values = zip(*matches)
+                lines = np.searchsorted(breaks, starts)
+                # 丟棄跨行的匹配，並且每行只保留第一個匹配（與逐行 re.search 相同）
+                keep = np.flatnonzero(lines == np.searchsorted(breaks, np.asarray(ends) - 1))
+                lines = lines[keep]
+                first = np.ones(len(lines), dtype=bool)
+                first[1:] = lines[1:] != lines[:-1]
+                
+                values, timestamps = results[name]
+                selected = []
+                for index, line in zip(keep[first].tolist(), lines[first].tolist()):
+                    # 同一行的時間戳只查找一次，供所有指標共用
+                    timestamp = line_timestamps.get(line, False)
+                    if timestamp is False:
+                        start = break_list[line - 1] + 1 if line else 0
+                        end = break_list[line] if line < len(break_list) else size
+                        timestamp_match = TIMESTAMP_BYTES_RE.search(text, start, end)
+                        timestamp = timestamp_match.group(1).decode() if timestamp_match else None
+                        line_timestamps[line] = timestamp
+                    if timestamp is None:
+                        continue
+                    selected.append(raw_values[index])
+                    timestamps.append(timestamp)
+                if selected:
+                    # 數值字節串一次性由 NumPy 在 C 中轉換，不再逐個調用 float()/int()
+                    converted = np.array(selected).astype(np.float64 if convert is float else np.int64)
+                    values.frombytes(memoryview(converted).cast('B'))
+    
+    return results
+
+
+def _extract_handover_events(log_file):
+    """從一個日誌文件中提取切換事件，返回按行順序排列的
+    (時間戳, 源小區, 目標小區, 切換類型, 切換延遲, 是否失敗) 六個列表"""
+    lines = _read_handover_lines(log_file)
+    if pc is not None:
+        return _extract_handover_fields_arrow(lines)
+    return _extract_handover_fields_lines(lines)
+
+
+def _read_handover_lines(log_file):
+    """返回日誌文件中所有含 'Handover' 的行"""
+    lines = []
+    with open(log_file, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return lines
+        # 映射而不是逐行讀入文件，只有含 'Handover' 的行需要解碼
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as text:
+            size = len(text)
+            # 下一個 \n 和 \r 的位置（與文本模式的通用換行一致，\r 也算換行），只向前掃描一次
+            next_lf = next_cr = -1
+            end = 0
+            pos = text.find(b'Handover')
+            while pos >= 0:
+                if next_lf < pos:
+                    next_lf = text.find(b'\n', pos)
+                    if next_lf < 0:
+                        next_lf = size
+                if next_cr < pos:
+                    next_cr = text.find(b'\r', pos)
+                    if next_cr < 0:
+                        next_cr = size
+                # 行首只在上一個處理過的行尾之後查找
+                start = max(text.rfind(b'\n', end, pos), text.rfind(b'\r', end, pos)) + 1
+                end = min(next_lf, next_cr)
+                lines.append(text[start:end].decode())
+                # 同一行中的其餘 'Handover' 不再重複處理
+                pos = text.find(b'Handover', end)
+    return lines
+
+
+def _extract_handover_fields_arrow(lines):
+    """各字段的提取都在 Arrow 的原生內核中完成"""
+    lines = pa.array(lines, type=pa.string())
+    timestamps = pc.struct_field(pc.extract_regex(lines, f'(?P<value>{TIMESTAMP_PATTERN})'), 'value')
+    has_timestamp = timestamps.is_valid()
+    lines = lines.filter(has_timestamp)
+    
+    def field(pattern):
+        # 沒有匹配的行為 null，轉為 Python 列表後即為 None
+        return pc.struct_field(pc.extract_regex(lines, pattern.pattern), 'value')
+    
+    ho_types = pc.if_else(
+        pc.match_substring(lines, 'Intra-frequency'), 'Intra-frequency',
+        pc.if_else(pc.match_substring(lines, 'Inter-frequency'), 'Inter-frequency', 'Unknown')
+    )
+    # 與 line.lower() 後的子字符串檢查結果相同
+    failures = pc.match_substring_regex(lines, 'failure|failed', ignore_case=True)
+    return (
+        timestamps.filter(has_timestamp).to_pylist(),
+        field(HANDOVER_SOURCE_RE).to_pylist(),
+        field(HANDOVER_TARGET_RE).to_pylist(),
+        ho_types.to_pylist(),
+        field(HANDOVER_DELAY_RE).cast(pa.float64()).to_pylist(),
+        failures.to_pylist(),
+    )
+
+
+def _extract_handover_fields_lines(lines):
+    """逐行提取各字段，pyarrow 不可用時使用"""
+    columns = ([], [], [], [], [], [])
+    add_timestamp, add_source, add_target, add_type, add_delay, add_failure = (
+        column.append for column in columns
+    )
+    # 預編譯正則的綁定方法，避免循環中重複查找屬性
+    timestamp_search = TIMESTAMP_RE.search
+    source_search = HANDOVER_SOURCE_RE.search
+    target_search = HANDOVER_TARGET_RE.search
+    delay_search = HANDOVER_DELAY_RE.search
+    
+    for line in lines:
+        # 提取時間戳
+        timestamp_match = timestamp_search(line)
+        if not timestamp_match:
+            continue
+        add_timestamp(timestamp_match.group(1))
+        
+        # 提取切換事件的源小區和目標小區（不含對應子字符串的行不可能匹配）
+        source_match = source_search(line) if 'from ' in line else None
+        target_match = target_search(line) if 'to ' in line else None
+        add_source(source_match.group(1) if source_match else None)
+        add_target(target_match.group(1) if target_match else None)
+        
+        # 提取切換類型
+        ho_type = 'Unknown'
+        if 'Intra-frequency' in line:
+            ho_type = 'Intra-frequency'
+        elif 'Inter-frequency' in line:
+            ho_type = 'Inter-frequency'
+        add_type(ho_type)
+        
+        # 提取切換延遲
+        delay_match = delay_search(line) if 'delay' in line else None
+        add_delay(float(delay_match.group(1)) if delay_match else None)
+        
+        # 檢查是否為切換失敗
+        lowered = line.lower()
+        add_failure('failure' in lowered or 'failed' in lowered)
+    
+    return columns
+
+
+def _timestamp_nanoseconds(timestamps, cache=None):
+    """返回時間戳字符串對應的納秒整數數組，未見過的字符串一次性批量解析
+
+    cache 是調用方持有的 時間戳字符串 -> 納秒整數 字典，只在同一批時間戳會被多個指標和圖表
+    重複使用時傳入；不傳時直接解析，不保留任何狀態
+    """
+    if cache is None:
+        return np.array(timestamps, dtype='datetime64[ns]').view(np.int64)
+    missing = [ts for ts in dict.fromkeys(timestamps) if ts not in cache]
+    if missing:
+        # NumPy 的 ISO 8601 解析器在 C 中一次轉換整個列表（日期和時間之間允許空格）
+        nanoseconds = np.array(missing, dtype='datetime64[ns]').view(np.int64)
+        cache.update(zip(missing, nanoseconds.tolist()))
+    return np.fromiter(map(cache.__getitem__, timestamps), dtype=np.int64, count=len(timestamps))
+
+
+def _relative_seconds(timestamps, cache=None):
+    """返回相對於第一個時間戳的秒數"""
+    nanoseconds = _timestamp_nanoseconds(timestamps, cache)
+    return ((nanoseconds - nanoseconds[0]) / 1e9).tolist()
+
+
+def _summary_statistics(values):
+    """一次轉換為 NumPy 數組後計算 min/max/avg/median/std/count"""
+    arr = np.asarray(values)
+    count = arr.size
+    middle = count // 2
+    return {
+        'min': arr.min().item(),
+        'max': arr.max().item(),
+        'avg': arr.mean().item(),
+        # 與原來的 sorted(values)[n // 2] 相同（偶數個時取上中位數），用 O(n) 選擇代替排序
+        'median': np.partition(arr, middle)[middle].item(),
+        'std': arr.std().item() if count > 1 else 0,
+        'count': count
+    }
+
+
+def _dump_json_file(obj, file_path, default=None):
+    """以兩格縮排寫入 JSON 文件，優先使用 orjson"""
+    if orjson is not None:
+        # 與 json.dump 一樣把非字符串的鍵轉為字符串
+        option = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        with open(file_path, 'wb') as f:
+            f.write(orjson.dumps(obj, default=default, option=option))
+        return
+    with open(file_path, 'w') as f:
+        json.dump(obj, f, indent=2, default=default)
+
 
 class RadioMetricsCollector:
     """無線指標收集器，用於收集和分析無線層性能指標"""
@@ -30,20 +380,33 @@ class RadioMetricsCollector:
         os.makedirs(self.output_dir, exist_ok=True)
         
         # 初始化數據結構
-        self.rsrp_values = defaultdict(list)  # 按 UE ID 分組的 RSRP 值
-        self.rsrq_values = defaultdict(list)  # 按 UE ID 分組的 RSRQ 值
-        self.sinr_values = defaultdict(list)  # 按 UE ID 分組的 SINR 值
-        self.cqi_values = defaultdict(list)   # 按 UE ID 分組的 CQI 值
-        self.mcs_values = defaultdict(list)   # 按 UE ID 分組的 MCS 值
-        self.bler_values = defaultdict(list)  # 按 UE ID 分組的 BLER 值
+        self.rsrp_values = defaultdict(partial(array.array, 'd'))  # 按 UE ID 分組的 RSRP 值
+        self.rsrq_values = defaultdict(partial(array.array, 'd'))  # 按 UE ID 分組的 RSRQ 值
+        self.sinr_values = defaultdict(partial(array.array, 'd'))  # 按 UE ID 分組的 SINR 值
+        self.cqi_values = defaultdict(partial(array.array, 'q'))  # 按 UE ID 分組的 CQI 值
+        self.mcs_values = defaultdict(partial(array.array, 'q'))  # 按 UE ID 分組的 MCS 值
+        self.bler_values = defaultdict(partial(array.array, 'd'))  # 按 UE ID 分組的 BLER 值
         
         # 時間戳記錄
-        self.timestamps = defaultdict(list)   # 按 UE ID 分組的時間戳
+        self.timestamps = defaultdict(list)   # 按 (UE ID, 指標名稱) 分組的時間戳
+        
+        # 所有指標共用的圖表對象，每次繪製前清空坐標軸
+        self._time_series_ax = Figure(figsize=(12, 6)).subplots()
+        self._boxplot_ax = Figure(figsize=(10, 6)).subplots()
+        
+        # calculate_statistics 的結果，重新提取日誌時清除
+        self._statistics = None
+        
+        # 時間戳字符串 -> 納秒整數，各指標圖表共用，重新提取日誌時清除
+        self._timestamp_cache = {}
     
     def extract_metrics_from_logs(self):
         """從日誌文件中提取無線指標"""
         print("Extracting radio metrics from logs...")
+        self._statistics = None
+        self._timestamp_cache = {}
         
+        sources = []
         for log_file in self.log_files:
             if not os.path.exists(log_file):
                 print(f"Warning: Log file {log_file} does not exist")
@@ -53,68 +416,40 @@ class RadioMetricsCollector:
             
             # 從文件名中提取 UE ID
             ue_id = None
-            match = re.search(r'ue(\d+)', os.path.basename(log_file))
+            match = UE_FILE_RE.search(os.path.basename(log_file))
             if match:
                 ue_id = match.group(1)
             else:
                 # 如果無法從文件名中提取，使用文件索引作為 ID
                 ue_id = str(self.log_files.index(log_file) + 1)
             
-            with open(log_file, 'r') as f:
-                for line in f:
-                    # 提取時間戳
-                    timestamp_match = re.search(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+)', line)
-                    timestamp = timestamp_match.group(1) if timestamp_match else None
-                    
-                    if not timestamp:
-                        continue
-                    
-                    # 提取 RSRP
-                    rsrp_match = re.search(r'RSRP[: =]+(-?\d+\.?\d*)', line)
-                    if rsrp_match:
-                        rsrp = float(rsrp_match.group(1))
-                        self.rsrp_values[ue_id].append(rsrp)
-                        self.timestamps[f"{ue_id}_rsrp"].append(timestamp)
-                    
-                    # 提取 RSRQ
-                    rsrq_match = re.search(r'RSRQ[: =]+(-?\d+\.?\d*)', line)
-                    if rsrq_match:
-                        rsrq = float(rsrq_match.group(1))
-                        self.rsrq_values[ue_id].append(rsrq)
-                        self.timestamps[f"{ue_id}_rsrq"].append(timestamp)
-                    
-                    # 提取 SINR
-                    sinr_match = re.search(r'SINR[: =]+(-?\d+\.?\d*)', line)
-                    if sinr_match:
-                        sinr = float(sinr_match.group(1))
-                        self.sinr_values[ue_id].append(sinr)
-                        self.timestamps[f"{ue_id}_sinr"].append(timestamp)
-                    
-                    # 提取 CQI
-                    cqi_match = re.search(r'CQI[: =]+(\d+)', line)
-                    if cqi_match:
-                        cqi = int(cqi_match.group(1))
-                        self.cqi_values[ue_id].append(cqi)
-                        self.timestamps[f"{ue_id}_cqi"].append(timestamp)
-                    
-                    # 提取 MCS
-                    mcs_match = re.search(r'MCS[: =]+(\d+)', line)
-                    if mcs_match:
-                        mcs = int(mcs_match.group(1))
-                        self.mcs_values[ue_id].append(mcs)
-                        self.timestamps[f"{ue_id}_mcs"].append(timestamp)
-                    
-                    # 提取 BLER
-                    bler_match = re.search(r'BLER[: =]+(\d+\.?\d*)', line)
-                    if bler_match:
-                        bler = float(bler_match.group(1))
-                        self.bler_values[ue_id].append(bler)
-                        self.timestamps[f"{ue_id}_bler"].append(timestamp)
+            sources.append((log_file, ue_id))
+        
+        metric_values = {
+            'rsrp': self.rsrp_values,
+            'rsrq': self.rsrq_values,
+            'sinr': self.sinr_values,
+            'cqi': self.cqi_values,
+            'mcs': self.mcs_values,
+            'bler': self.bler_values,
+        }
+        log_results = _map_log_files(
+            _extract_log_metrics, [log_file for log_file, _ in sources], RADIO_METRICS, RADIO_KEYWORDS, RADIO_METRIC_PATTERNS
+        )
+        # 按文件順序合併，同一 UE 的多個文件保持原有的數據順序
+        for (_, ue_id), results in zip(sources, log_results):
+            for name, (values, timestamps) in results.items():
+                if values:
+                    metric_values[name][ue_id].extend(values)
+                    self.timestamps[ue_id, name].extend(timestamps)
         
         print("Radio metrics extraction completed")
     
     def calculate_statistics(self):
-        """計算無線指標的統計數據"""
+        """計算無線指標的統計數據，結果會被緩存直到再次提取日誌"""
+        if self._statistics is not None:
+            return self._statistics
+        
         statistics = {}
         
         # 計算 RSRP 統計數據
@@ -135,6 +470,7 @@ class RadioMetricsCollector:
         # 計算 BLER 統計數據
         statistics['bler'] = self._calculate_metric_statistics(self.bler_values)
         
+        self._statistics = statistics
         return statistics
     
     def _calculate_metric_statistics(self, metric_values):
@@ -142,17 +478,10 @@ class RadioMetricsCollector:
         statistics = {}
         
         for ue_id, values in metric_values.items():
-            if not values:
+            if not len(values):
                 continue
             
-            statistics[ue_id] = {
-                'min': min(values),
-                'max': max(values),
-                'avg': sum(values) / len(values),
-                'median': sorted(values)[len(values) // 2],
-                'std': np.std(values) if len(values) > 1 else 0,
-                'count': len(values)
-            }
+            statistics[ue_id] = _summary_statistics(values)
         
         return statistics
     
@@ -185,18 +514,15 @@ class RadioMetricsCollector:
         time_series = {}
         
         for ue_id, values in metric_values.items():
-            timestamps = self.timestamps[f"{ue_id}_{metric_name}"]
+            timestamps = self.timestamps[ue_id, metric_name]
             
             if not values or not timestamps or len(values) != len(timestamps):
                 continue
             
-            # 將時間戳轉換為 datetime 對象
-            datetime_timestamps = [datetime.datetime.strptime(ts, '%Y-%m-%d %H:%M:%S.%f') for ts in timestamps]
-            
             # 創建時間序列數據
             time_series[ue_id] = {
                 'timestamps': timestamps,
-                'values': values
+                'values': values.tolist()
             }
         
         return time_series
@@ -227,35 +553,37 @@ class RadioMetricsCollector:
     
     def _plot_metric(self, metric_values, metric_name, unit, charts_dir):
         """繪製指標圖表"""
+        metric_key = metric_name.lower()
+        
         # 繪製時間序列圖
-        plt.figure(figsize=(12, 6))
+        ax = self._time_series_ax
+        ax.clear()
         
         for ue_id, values in metric_values.items():
             if not values:
                 continue
             
-            timestamps = self.timestamps[f"{ue_id}_{metric_name.lower()}"]
+            timestamps = self.timestamps[ue_id, metric_key]
             if not timestamps or len(timestamps) != len(values):
                 continue
             
             # 將時間戳轉換為相對時間（秒）
-            start_time = datetime.datetime.strptime(timestamps[0], '%Y-%m-%d %H:%M:%S.%f')
-            relative_times = [(datetime.datetime.strptime(ts, '%Y-%m-%d %H:%M:%S.%f') - start_time).total_seconds() for ts in timestamps]
+            relative_times = _relative_seconds(timestamps, self._timestamp_cache)
             
-            plt.plot(relative_times, values, label=f"UE {ue_id}")
+            ax.plot(relative_times, values, label=f"UE {ue_id}")
         
-        plt.title(f"{metric_name} Time Series")
-        plt.xlabel("Time (seconds)")
-        plt.ylabel(f"{metric_name} ({unit})" if unit else metric_name)
-        plt.grid(True)
-        plt.legend()
-        plt.tight_layout()
+        ax.set_title(f"{metric_name} Time Series")
+        ax.set_xlabel("Time (seconds)")
+        ax.set_ylabel(f"{metric_name} ({unit})" if unit else metric_name)
+        ax.grid(True)
+        ax.legend()
+        ax.figure.tight_layout()
         
-        plt.savefig(os.path.join(charts_dir, f"{metric_name.lower()}_time_series.png"))
-        plt.close()
+        ax.figure.savefig(os.path.join(charts_dir, f"{metric_name.lower()}_time_series.png"))
         
         # 繪製箱線圖
-        plt.figure(figsize=(10, 6))
+        ax = self._boxplot_ax
+        ax.clear()
         
         data = []
         labels = []
@@ -268,45 +596,25 @@ class RadioMetricsCollector:
             labels.append(f"UE {ue_id}")
         
         if data:
-            plt.boxplot(data, labels=labels)
-            plt.title(f"{metric_name} Distribution by UE")
-            plt.xlabel("UE")
-            plt.ylabel(f"{metric_name} ({unit})" if unit else metric_name)
-            plt.grid(True, axis='y')
-            plt.tight_layout()
-            
-            plt.savefig(os.path.join(charts_dir, f"{metric_name.lower()}_boxplot.png"))
-        
-        plt.close()
+            ax.boxplot(data, labels=labels)
+            ax.set_title(f"{metric_name} Distribution by UE")
+            ax.set_xlabel("UE")
+            ax.set_ylabel(f"{metric_name} ({unit})" if unit else metric_name)
+            ax.grid(True, axis='y')
+            ax.figure.tight_layout()
+            
+            ax.figure.savefig(os.path.join(charts_dir, f"{metric_name.lower()}_boxplot.png"))
     
     def save_results(self):
         """保存分析結果"""
-        # 計算統計數據
-        statistics = self.calculate_statistics()
-        
-        # 生成時間序列數據
-        time_series = self.generate_time_series_data()
+        # 保存 CSV 格式的數據，同一次遍歷中得到統計數據和可序列化的時間序列數據
+        statistics, time_series = self._save_csv_data()
         
         # 保存統計數據
-        with open(os.path.join(self.output_dir, 'radio_metrics_statistics.json'), 'w') as f:
-            json.dump(statistics, f, indent=2)
+        _dump_json_file(statistics, os.path.join(self.output_dir, 'radio_metrics_statistics.json'))
         
         # 保存時間序列數據
-        with open(os.path.join(self.output_dir, 'radio_metrics_time_series.json'), 'w') as f:
-            # 將不可序列化的對象轉換為字符串
-            serializable_time_series = {}
-            for metric, ue_data in time_series.items():
-                serializable_time_series[metric] = {}
-                for ue_id, data in ue_data.items():
-                    serializable_time_series[metric][ue_id] = {
-                        'timestamps': data['timestamps'],
-                        'values': data['values']
-                    }
-            
-            json.dump(serializable_time_series, f, indent=2)
-        
-        # 保存 CSV 格式的數據
-        self._save_csv_data()
+        _dump_json_file(time_series, os.path.join(self.output_dir, 'radio_metrics_time_series.json'))
         
         # 繪製圖表
         self.plot_metrics()
@@ -314,28 +622,36 @@ class RadioMetricsCollector:
         print(f"Radio metrics results saved to {self.output_dir}")
     
     def _save_csv_data(self):
-        """保存 CSV 格式的數據"""
+        """保存 CSV 格式的數據，返回同時得到的統計數據和時間序列數據"""
+        statistics = {}
+        time_series = {}
+        
         # 保存 RSRP 數據
-        self._save_metric_csv(self.rsrp_values, 'rsrp', 'RSRP')
+        self._save_metric_csv(self.rsrp_values, 'rsrp', 'RSRP', statistics, time_series)
         
         # 保存 RSRQ 數據
-        self._save_metric_csv(self.rsrq_values, 'rsrq', 'RSRQ')
+        self._save_metric_csv(self.rsrq_values, 'rsrq', 'RSRQ', statistics, time_series)
         
         # 保存 SINR 數據
-        self._save_metric_csv(self.sinr_values, 'sinr', 'SINR')
+        self._save_metric_csv(self.sinr_values, 'sinr', 'SINR', statistics, time_series)
         
         # 保存 CQI 數據
-        self._save_metric_csv(self.cqi_values, 'cqi', 'CQI')
+        self._save_metric_csv(self.cqi_values, 'cqi', 'CQI', statistics, time_series)
         
         # 保存 MCS 數據
-        self._save_metric_csv(self.mcs_values, 'mcs', 'MCS')
+        self._save_metric_csv(self.mcs_values, 'mcs', 'MCS', statistics, time_series)
         
         # 保存 BLER 數據
-        self._save_metric_csv(self.bler_values, 'bler', 'BLER')
+        self._save_metric_csv(self.bler_values, 'bler', 'BLER', statistics, time_series)
+        
+        self._statistics = statistics
+        return statistics, time_series
     
-    def _save_metric_csv(self, metric_values, metric_name, metric_title):
-        """保存指標的 CSV 數據"""
+    def _save_metric_csv(self, metric_values, metric_name, metric_title, statistics, time_series):
+        """保存指標的 CSV 數據，並把統計數據和時間序列數據填入 statistics/time_series"""
         csv_file = os.path.join(self.output_dir, f"{metric_name}_data.csv")
+        metric_statistics = statistics[metric_name] = {}
+        metric_time_series = time_series[metric_name] = {}
         
         with open(csv_file, 'w', newline='') as f:
             writer = csv.writer(f)
@@ -344,15 +660,26 @@ class RadioMetricsCollector:
             header = ['UE ID', 'Timestamp', metric_title]
             writer.writerow(header)
             
-            # 寫入數據行
+            # 每個實體的數據只遍歷一次
             for ue_id, values in metric_values.items():
-                timestamps = self.timestamps[f"{ue_id}_{metric_name}"]
+                if not values:
+                    continue
+                
+                metric_statistics[ue_id] = _summary_statistics(values)
                 
-                if not values or not timestamps or len(values) != len(timestamps):
+                timestamps = self.timestamps[ue_id, metric_name]
+                if not timestamps or len(values) != len(timestamps):
                     continue
                 
-                for i, value in enumerate(values):
-                    writer.writerow([ue_id, timestamps[i], value])
+                metric_time_series[ue_id] = {
+                    'timestamps': timestamps,
+                    'values': values.tolist()
+                }
+                
+                # 寫入數據行：ID 和時間戳都不含分隔符或引號，不需要 csv 模塊逐行轉義，
+                # 整塊格式化後一次寫出（與 csv.writer 的輸出逐字節相同）
+                prefix = f"{ue_id},"
+                f.write(''.join([f"{prefix}{timestamp},{value!r}\r\n" for timestamp, value in zip(timestamps, values)]))
 
 class MACMetricsCollector:
     """MAC 層指標收集器，用於收集和分析 MAC 層性能指標"""
@@ -364,23 +691,36 @@ class MACMetricsCollector:
         os.makedirs(self.output_dir, exist_ok=True)
         
         # 初始化數據結構
-        self.dl_throughput = defaultdict(list)  # 按 UE ID 分組的下行吞吐量
-        self.ul_throughput = defaultdict(list)  # 按 UE ID 分組的上行吞吐量
-        self.dl_latency = defaultdict(list)     # 按 UE ID 分組的下行延遲
-        self.ul_latency = defaultdict(list)     # 按 UE ID 分組的上行延遲
-        self.harq_retx = defaultdict(list)      # 按 UE ID 分組的 HARQ 重傳次數
-        self.dl_mcs = defaultdict(list)         # 按 UE ID 分組的下行 MCS
-        self.ul_mcs = defaultdict(list)         # 按 UE ID 分組的上行 MCS
-        self.dl_rb_utilization = defaultdict(list)  # 按 UE ID 分組的下行 RB 利用率
-        self.ul_rb_utilization = defaultdict(list)  # 按 UE ID 分組的上行 RB 利用率
+        self.dl_throughput = defaultdict(partial(array.array, 'd'))  # 按 UE ID 分組的下行吞吐量
+        self.ul_throughput = defaultdict(partial(array.array, 'd'))  # 按 UE ID 分組的上行吞吐量
+        self.dl_latency = defaultdict(partial(array.array, 'd'))  # 按 UE ID 分組的下行延遲
+        self.ul_latency = defaultdict(partial(array.array, 'd'))  # 按 UE ID 分組的上行延遲
+        self.harq_retx = defaultdict(partial(array.array, 'q'))  # 按 UE ID 分組的 HARQ 重傳次數
+        self.dl_mcs = defaultdict(partial(array.array, 'q'))  # 按 UE ID 分組的下行 MCS
+        self.ul_mcs = defaultdict(partial(array.array, 'q'))  # 按 UE ID 分組的上行 MCS
+        self.dl_rb_utilization = defaultdict(partial(array.array, 'd'))  # 按 UE ID 分組的下行 RB 利用率
+        self.ul_rb_utilization = defaultdict(partial(array.array, 'd'))  # 按 UE ID 分組的上行 RB 利用率
         
         # 時間戳記錄
-        self.timestamps = defaultdict(list)     # 按 UE ID 和指標類型分組的時間戳
+        self.timestamps = defaultdict(list)     # 按 (實體 ID, 指標名稱) 分組的時間戳
+        
+        # 所有指標共用的圖表對象，每次繪製前清空坐標軸
+        self._time_series_ax = Figure(figsize=(12, 6)).subplots()
+        self._boxplot_ax = Figure(figsize=(10, 6)).subplots()
+        
+        # calculate_statistics 的結果，重新提取日誌時清除
+        self._statistics = None
+        
+        # 時間戳字符串 -> 納秒整數，各指標圖表共用，重新提取日誌時清除
+        self._timestamp_cache = {}
     
     def extract_metrics_from_logs(self):
         """從日誌文件中提取 MAC 層指標"""
         print("Extracting MAC metrics from logs...")
+        self._statistics = None
+        self._timestamp_cache = {}
         
+        sources = []
         for log_file in self.log_files:
             if not os.path.exists(log_file):
                 print(f"Warning: Log file {log_file} does not exist")
@@ -390,8 +730,8 @@ class MACMetricsCollector:
             
             # 從文件名中提取 UE ID 或 gNB ID
             entity_id = None
-            ue_match = re.search(r'ue(\d+)', os.path.basename(log_file))
-            gnb_match = re.search(r'gnb(\d+)', os.path.basename(log_file))
+            ue_match = UE_FILE_RE.search(os.path.basename(log_file))
+            gnb_match = GNB_FILE_RE.search(os.path.basename(log_file))
             
             if ue_match:
                 entity_id = f"UE{ue_match.group(1)}"
@@ -401,82 +741,36 @@ class MACMetricsCollector:
                 # 如果無法從文件名中提取，使用文件索引作為 ID
                 entity_id = f"Entity{self.log_files.index(log_file) + 1}"
             
-            with open(log_file, 'r') as f:
-                for line in f:
-                    # 提取時間戳
-                    timestamp_match = re.search(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+)', line)
-                    timestamp = timestamp_match.group(1) if timestamp_match else None
-                    
-                    if not timestamp:
-                        continue
-                    
-                    # 提取下行吞吐量
-                    dl_tp_match = re.search(r'DL[_\s]throughput[:\s=]+(\d+\.?\d*)', line)
-                    if dl_tp_match:
-                        dl_tp = float(dl_tp_match.group(1))
-                        self.dl_throughput[entity_id].append(dl_tp)
-                        self.timestamps[f"{entity_id}_dl_throughput"].append(timestamp)
-                    
-                    # 提取上行吞吐量
-                    ul_tp_match = re.search(r'UL[_\s]throughput[:\s=]+(\d+\.?\d*)', line)
-                    if ul_tp_match:
-                        ul_tp = float(ul_tp_match.group(1))
-                        self.ul_throughput[entity_id].append(ul_tp)
-                        self.timestamps[f"{entity_id}_ul_throughput"].append(timestamp)
-                    
-                    # 提取下行延遲
-                    dl_lat_match = re.search(r'DL[_\s]latency[:\s=]+(\d+\.?\d*)', line)
-                    if dl_lat_match:
-                        dl_lat = float(dl_lat_match.group(1))
-                        self.dl_latency[entity_id].append(dl_lat)
-                        self.timestamps[f"{entity_id}_dl_latency"].append(timestamp)
-                    
-                    # 提取上行延遲
-                    ul_lat_match = re.search(r'UL[_\s]latency[:\s=]+(\d+\.?\d*)', line)
-                    if ul_lat_match:
-                        ul_lat = float(ul_lat_match.group(1))
-                        self.ul_latency[entity_id].append(ul_lat)
-                        self.timestamps[f"{entity_id}_ul_latency"].append(timestamp)
-                    
-                    # 提取 HARQ 重傳次數
-                    harq_match = re.search(r'HARQ[_\s]retx[:\s=]+(\d+)', line)
-                    if harq_match:
-                        harq = int(harq_match.group(1))
-                        self.harq_retx[entity_id].append(harq)
-                        self.timestamps[f"{entity_id}_harq_retx"].append(timestamp)
-                    
-                    # 提取下行 MCS
-                    dl_mcs_match = re.search(r'DL[_\s]MCS[:\s=]+(\d+)', line)
-                    if dl_mcs_match:
-                        dl_mcs = int(dl_mcs_match.group(1))
-                        self.dl_mcs[entity_id].append(dl_mcs)
-                        self.timestamps[f"{entity_id}_dl_mcs"].append(timestamp)
-                    
-                    # 提取上行 MCS
-                    ul_mcs_match = re.search(r'UL[_\s]MCS[:\s=]+(\d+)', line)
-                    if ul_mcs_match:
-                        ul_mcs = int(ul_mcs_match.group(1))
-                        self.ul_mcs[entity_id].append(ul_mcs)
-                        self.timestamps[f"{entity_id}_ul_mcs"].append(timestamp)
-                    
-                    # 提取下行 RB 利用率
-                    dl_rb_match = re.search(r'DL[_\s]RB[_\s]utilization[:\s=]+(\d+\.?\d*)', line)
-                    if dl_rb_match:
-                        dl_rb = float(dl_rb_match.group(1))
-                        self.dl_rb_utilization[entity_id].append(dl_rb)
-                        self.timestamps[f"{entity_id}_dl_rb_utilization"].append(timestamp)
-                    
-                    # 提取上行 RB 利用率
-                    ul_rb_match = re.search(r'UL[_\s]RB[_\s]utilization[:\s=]+(\d+\.?\d*)', line)
-                    if ul_rb_match:
-                        ul_rb = float(ul_rb_match.group(1))
-                        self.ul_rb_utilization[entity_id].append(ul_rb)
-                        self.timestamps[f"{entity_id}_ul_rb_utilization"].append(timestamp)
+            sources.append((log_file, entity_id))
+        
+        metric_values = {
+            'dl_throughput': self.dl_throughput,
+            'ul_throughput': self.ul_throughput,
+            'dl_latency': self.dl_latency,
+            'ul_latency': self.ul_latency,
+            'harq_retx': self.harq_retx,
+            'dl_mcs': self.dl_mcs,
+            'ul_mcs': self.ul_mcs,
+            'dl_rb_utilization': self.dl_rb_utilization,
+            'ul_rb_utilization': self.ul_rb_utilization,
+        }
+        log_results = _map_log_files(
+            _extract_log_metrics, [log_file for log_file, _ in sources], MAC_METRICS, MAC_KEYWORDS, MAC_METRIC_PATTERNS
+        )
+        # 按文件順序合併，同一實體的多個文件保持原有的數據順序
+        for (_, entity_id), results in zip(sources, log_results):
+            for name, (values, timestamps) in results.items():
+                if values:
+                    metric_values[name][entity_id].extend(values)
+                    self.timestamps[entity_id, name].extend(timestamps)
         
         print("MAC metrics extraction completed")
     
     def calculate_statistics(self):
-        """計算 MAC 層指標的統計數據"""
+        """計算 MAC 層指標的統計數據，結果會被緩存直到再次提取日誌"""
+        if self._statistics is not None:
+            return self._statistics
+        
         statistics = {}
         
         # 計算下行吞吐量統計數據
@@ -506,6 +800,7 @@ class MACMetricsCollector:
         # 計算上行 RB 利用率統計數據
         statistics['ul_rb_utilization'] = self._calculate_metric_statistics(self.ul_rb_utilization)
         
+        self._statistics = statistics
         return statistics
     
     def _calculate_metric_statistics(self, metric_values):
@@ -513,17 +808,10 @@ class MACMetricsCollector:
         statistics = {}
         
         for entity_id, values in metric_values.items():
-            if not values:
+            if not len(values):
                 continue
             
-            statistics[entity_id] = {
-                'min': min(values),
-                'max': max(values),
-                'avg': sum(values) / len(values),
-                'median': sorted(values)[len(values) // 2],
-                'std': np.std(values) if len(values) > 1 else 0,
-                'count': len(values)
-            }
+            statistics[entity_id] = _summary_statistics(values)
         
         return statistics
     
@@ -565,18 +853,15 @@ class MACMetricsCollector:
         time_series = {}
         
         for entity_id, values in metric_values.items():
-            timestamps = self.timestamps[f"{entity_id}_{metric_name}"]
+            timestamps = self.timestamps[entity_id, metric_name]
             
             if not values or not timestamps or len(values) != len(timestamps):
                 continue
             
-            # 將時間戳轉換為 datetime 對象
-            datetime_timestamps = [datetime.datetime.strptime(ts, '%Y-%m-%d %H:%M:%S.%f') for ts in timestamps]
-            
             # 創建時間序列數據
             time_series[entity_id] = {
                 'timestamps': timestamps,
-                'values': values
+                'values': values.tolist()
             }
         
         return time_series
@@ -616,36 +901,37 @@ class MACMetricsCollector:
     
     def _plot_metric(self, metric_values, metric_name, unit, charts_dir):
         """繪製指標圖表"""
+        metric_key = metric_name.lower().replace(' ', '_')
+        
         # 繪製時間序列圖
-        plt.figure(figsize=(12, 6))
+        ax = self._time_series_ax
+        ax.clear()
         
         for entity_id, values in metric_values.items():
             if not values:
                 continue
             
-            metric_key = metric_name.lower().replace(' ', '_')
-            timestamps = self.timestamps[f"{entity_id}_{metric_key}"]
+            timestamps = self.timestamps[entity_id, metric_key]
             if not timestamps or len(timestamps) != len(values):
                 continue
             
             # 將時間戳轉換為相對時間（秒）
-            start_time = datetime.datetime.strptime(timestamps[0], '%Y-%m-%d %H:%M:%S.%f')
-            relative_times = [(datetime.datetime.strptime(ts, '%Y-%m-%d %H:%M:%S.%f') - start_time).total_seconds() for ts in timestamps]
+            relative_times = _relative_seconds(timestamps, self._timestamp_cache)
             
-            plt.plot(relative_times, values, label=entity_id)
+            ax.plot(relative_times, values, label=entity_id)
         
-        plt.title(f"{metric_name} Time Series")
-        plt.xlabel("Time (seconds)")
-        plt.ylabel(f"{metric_name} ({unit})" if unit else metric_name)
-        plt.grid(True)
-        plt.legend()
-        plt.tight_layout()
+        ax.set_title(f"{metric_name} Time Series")
+        ax.set_xlabel("Time (seconds)")
+        ax.set_ylabel(f"{metric_name} ({unit})" if unit else metric_name)
+        ax.grid(True)
+        ax.legend()
+        ax.figure.tight_layout()
         
-        plt.savefig(os.path.join(charts_dir, f"{metric_name.lower().replace(' ', '_')}_time_series.png"))
-        plt.close()
+        ax.figure.savefig(os.path.join(charts_dir, f"{metric_name.lower().replace(' ', '_')}_time_series.png"))
         
         # 繪製箱線圖
-        plt.figure(figsize=(10, 6))
+        ax = self._boxplot_ax
+        ax.clear()
         
         data = []
         labels = []
@@ -658,45 +944,25 @@ class MACMetricsCollector:
             labels.append(entity_id)
         
         if data:
-            plt.boxplot(data, labels=labels)
-            plt.title(f"{metric_name} Distribution by Entity")
-            plt.xlabel("Entity")
-            plt.ylabel(f"{metric_name} ({unit})" if unit else metric_name)
-            plt.grid(True, axis='y')
-            plt.tight_layout()
-            
-            plt.savefig(os.path.join(charts_dir, f"{metric_name.lower().replace(' ', '_')}_boxplot.png"))
-        
-        plt.close()
+            ax.boxplot(data, labels=labels)
+            ax.set_title(f"{metric_name} Distribution by Entity")
+            ax.set_xlabel("Entity")
+            ax.set_ylabel(f"{metric_name} ({unit})" if unit else metric_name)
+            ax.grid(True, axis='y')
+            ax.figure.tight_layout()
+            
+            ax.figure.savefig(os.path.join(charts_dir, f"{metric_name.lower().replace(' ', '_')}_boxplot.png"))
     
     def save_results(self):
         """保存分析結果"""
-        # 計算統計數據
-        statistics = self.calculate_statistics()
-        
-        # 生成時間序列數據
-        time_series = self.generate_time_series_data()
+        # 保存 CSV 格式的數據，同一次遍歷中得到統計數據和可序列化的時間序列數據
+        statistics, time_series = self._save_csv_data()
         
         # 保存統計數據
-        with open(os.path.join(self.output_dir, 'mac_metrics_statistics.json'), 'w') as f:
-            json.dump(statistics, f, indent=2)
+        _dump_json_file(statistics, os.path.join(self.output_dir, 'mac_metrics_statistics.json'))
         
         # 保存時間序列數據
-        with open(os.path.join(self.output_dir, 'mac_metrics_time_series.json'), 'w') as f:
-            # 將不可序列化的對象轉換為字符串
-            serializable_time_series = {}
-            for metric, entity_data in time_series.items():
-                serializable_time_series[metric] = {}
-                for entity_id, data in entity_data.items():
-                    serializable_time_series[metric][entity_id] = {
-                        'timestamps': data['timestamps'],
-                        'values': data['values']
-                    }
-            
-            json.dump(serializable_time_series, f, indent=2)
-        
-        # 保存 CSV 格式的數據
-        self._save_csv_data()
+        _dump_json_file(time_series, os.path.join(self.output_dir, 'mac_metrics_time_series.json'))
         
         # 繪製圖表
         self.plot_metrics()
@@ -704,37 +970,45 @@ class MACMetricsCollector:
         print(f"MAC metrics results saved to {self.output_dir}")
     
     def _save_csv_data(self):
-        """保存 CSV 格式的數據"""
+        """保存 CSV 格式的數據，返回同時得到的統計數據和時間序列數據"""
+        statistics = {}
+        time_series = {}
+        
         # 保存下行吞吐量數據
-        self._save_metric_csv(self.dl_throughput, 'dl_throughput', 'DL Throughput (Mbps)')
+        self._save_metric_csv(self.dl_throughput, 'dl_throughput', 'DL Throughput (Mbps)', statistics, time_series)
         
         # 保存上行吞吐量數據
-        self._save_metric_csv(self.ul_throughput, 'ul_throughput', 'UL Throughput (Mbps)')
+        self._save_metric_csv(self.ul_throughput, 'ul_throughput', 'UL Throughput (Mbps)', statistics, time_series)
         
         # 保存下行延遲數據
-        self._save_metric_csv(self.dl_latency, 'dl_latency', 'DL Latency (ms)')
+        self._save_metric_csv(self.dl_latency, 'dl_latency', 'DL Latency (ms)', statistics, time_series)
         
         # 保存上行延遲數據
-        self._save_metric_csv(self.ul_latency, 'ul_latency', 'UL Latency (ms)')
+        self._save_metric_csv(self.ul_latency, 'ul_latency', 'UL Latency (ms)', statistics, time_series)
         
         # 保存 HARQ 重傳次數數據
-        self._save_metric_csv(self.harq_retx, 'harq_retx', 'HARQ Retransmissions')
+        self._save_metric_csv(self.harq_retx, 'harq_retx', 'HARQ Retransmissions', statistics, time_series)
         
         # 保存下行 MCS 數據
-        self._save_metric_csv(self.dl_mcs, 'dl_mcs', 'DL MCS')
+        self._save_metric_csv(self.dl_mcs, 'dl_mcs', 'DL MCS', statistics, time_series)
         
         # 保存上行 MCS 數據
-        self._save_metric_csv(self.ul_mcs, 'ul_mcs', 'UL MCS')
+        self._save_metric_csv(self.ul_mcs, 'ul_mcs', 'UL MCS', statistics, time_series)
         
         # 保存下行 RB 利用率數據
-        self._save_metric_csv(self.dl_rb_utilization, 'dl_rb_utilization', 'DL RB Utilization (%)')
+        self._save_metric_csv(self.dl_rb_utilization, 'dl_rb_utilization', 'DL RB Utilization (%)', statistics, time_series)
         
         # 保存上行 RB 利用率數據
-        self._save_metric_csv(self.ul_rb_utilization, 'ul_rb_utilization', 'UL RB Utilization (%)')
+        self._save_metric_csv(self.ul_rb_utilization, 'ul_rb_utilization', 'UL RB Utilization (%)', statistics, time_series)
+        
+        self._statistics = statistics
+        return statistics, time_series
     
-    def _save_metric_csv(self, metric_values, metric_name, metric_title):
-        """保存指標的 CSV 數據"""
+    def _save_metric_csv(self, metric_values, metric_name, metric_title, statistics, time_series):
+        """保存指標的 CSV 數據，並把統計數據和時間序列數據填入 statistics/time_series"""
         csv_file = os.path.join(self.output_dir, f"{metric_name}_data.csv")
+        metric_statistics = statistics[metric_name] = {}
+        metric_time_series = time_series[metric_name] = {}
         
         with open(csv_file, 'w', newline='') as f:
             writer = csv.writer(f)
@@ -743,15 +1017,26 @@ class MACMetricsCollector:
             header = ['Entity ID', 'Timestamp', metric_title]
             writer.writerow(header)
             
-            # 寫入數據行
+            # 每個實體的數據只遍歷一次
             for entity_id, values in metric_values.items():
-                timestamps = self.timestamps[f"{entity_id}_{metric_name}"]
+                if not values:
+                    continue
                 
-                if not values or not timestamps or len(values) != len(timestamps):
+                metric_statistics[entity_id] = _summary_statistics(values)
+                
+                timestamps = self.timestamps[entity_id, metric_name]
+                if not timestamps or len(values) != len(timestamps):
                     continue
                 
-                for i, value in enumerate(values):
-                    writer.writerow([entity_id, timestamps[i], value])
+                metric_time_series[entity_id] = {
+                    'timestamps': timestamps,
+                    'values': values.tolist()
+                }
+                
+                # 寫入數據行：ID 和時間戳都不含分隔符或引號，不需要 csv 模塊逐行轉義，
+                # 整塊格式化後一次寫出（與 csv.writer 的輸出逐字節相同）
+                prefix = f"{entity_id},"
+                f.write(''.join([f"{prefix}{timestamp},{value!r}\r\n" for timestamp, value in zip(timestamps, values)]))
 
 class HandoverMetricsCollector:
     """切換性能指標收集器，用於收集和分析切換性能指標"""
@@ -763,16 +1048,21 @@ class HandoverMetricsCollector:
         os.makedirs(self.output_dir, exist_ok=True)
         
         # 初始化數據結構
-        self.handover_events = []  # 切換事件列表
+        self.handover_event_columns = {field: [] for field in HANDOVER_EVENT_FIELDS}  # 列式存儲的切換事件
         self.handover_delays = defaultdict(list)  # 按 UE ID 分組的切換延遲
         self.handover_failures = defaultdict(list)  # 按 UE ID 分組的切換失敗
         self.ping_pong_handovers = defaultdict(list)  # 按 UE ID 分組的乒乓切換
         self.handover_types = defaultdict(Counter)  # 按 UE ID 分組的切換類型計數
+        
+        # calculate_statistics 的結果，重新提取日誌時清除
+        self._statistics = None
     
     def extract_metrics_from_logs(self):
         """從日誌文件中提取切換性能指標"""
         print("Extracting handover metrics from logs...")
+        self._statistics = None
         
+        sources = []
         for log_file in self.log_files:
             if not os.path.exists(log_file):
                 print(f"Warning: Log file {log_file} does not exist")
@@ -782,8 +1072,8 @@ class HandoverMetricsCollector:
             
             # 從文件名中提取 UE ID 或 gNB ID
             entity_id = None
-            ue_match = re.search(r'ue(\d+)', os.path.basename(log_file))
-            gnb_match = re.search(r'gnb(\d+)', os.path.basename(log_file))
+            ue_match = UE_FILE_RE.search(os.path.basename(log_file))
+            gnb_match = GNB_FILE_RE.search(os.path.basename(log_file))
             
             if ue_match:
                 entity_id = f"UE{ue_match.group(1)}"
@@ -793,99 +1083,76 @@ class HandoverMetricsCollector:
                 # 如果無法從文件名中提取，使用文件索引作為 ID
                 entity_id = f"Entity{self.log_files.index(log_file) + 1}"
             
-            # 記錄上一次切換的目標小區，用於檢測乒乓切換
-            last_handover = {}
+            sources.append((log_file, entity_id))
+        
+        log_events = _map_log_files(_extract_handover_events, [log_file for log_file, _ in sources])
+        columns = self.handover_event_columns
+        # 按文件順序合併
+        for (_, entity_id), events in zip(sources, log_events):
+            timestamps, source_cells, target_cells, ho_types, delays, failures = events
+            if not timestamps:
+                continue
             
-            with open(log_file, 'r') as f:
-                for line in f:
-                    # 提取時間戳
-                    timestamp_match = re.search(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+)', line)
-                    timestamp = timestamp_match.group(1) if timestamp_match else None
-                    
-                    if not timestamp:
-                        continue
-                    
-                    # 提取切換事件
-                    if 'Handover' in line:
-                        # 提取源小區和目標小區
-                        source_match = re.search(r'from (?:cell|PCI) (\d+)', line)
-                        target_match = re.search(r'to (?:cell|PCI) (\d+)', line)
-                        
-                        source_cell = source_match.group(1) if source_match else None
-                        target_cell = target_match.group(1) if target_match else None
-                        
-                        # 提取切換類型
-                        ho_type = 'Unknown'
-                        if 'Intra-frequency' in line:
-                            ho_type = 'Intra-frequency'
-                        elif 'Inter-frequency' in line:
-                            ho_type = 'Inter-frequency'
-                        
-                        # 提取切換延遲
-                        delay_match = re.search(r'delay[:\s=]+(\d+\.?\d*)', line)
-                        delay = float(delay_match.group(1)) if delay_match else None
-                        
-                        # 檢查是否為切換失敗
-                        is_failure = 'failure' in line.lower() or 'failed' in line.lower()
-                        
-                        # 檢查是否為乒乓切換
-                        is_ping_pong = False
-                        if entity_id in last_handover and source_cell and target_cell:
-                            last_target = last_handover.get(entity_id, {}).get('target_cell')
-                            last_source = last_handover.get(entity_id, {}).get('source_cell')
-                            
-                            if last_target == source_cell and last_source == target_cell:
-                                is_ping_pong = True
-                                self.ping_pong_handovers[entity_id].append({
-                                    'timestamp': timestamp,
-                                    'source_cell': source_cell,
-                                    'target_cell': target_cell
-                                })
-                        
-                        # 記錄切換事件
-                        handover_event = {
-                            'timestamp': timestamp,
-                            'entity_id': entity_id,
-                            'source_cell': source_cell,
-                            'target_cell': target_cell,
-                            'type': ho_type,
-                            'delay': delay,
-                            'is_failure': is_failure,
-                            'is_ping_pong': is_ping_pong
-                        }
-                        
-                        self.handover_events.append(handover_event)
-                        
-                        # 更新切換延遲
-                        if delay is not None:
-                            self.handover_delays[entity_id].append(delay)
-                        
-                        # 更新切換失敗
-                        if is_failure:
-                            self.handover_failures[entity_id].append({
-                                'timestamp': timestamp,
-                                'source_cell': source_cell,
-                                'target_cell': target_cell
-                            })
-                        
-                        # 更新切換類型計數
-                        self.handover_types[entity_id][ho_type] += 1
-                        
-                        # 更新上一次切換記錄
-                        last_handover[entity_id] = {
-                            'timestamp': timestamp,
-                            'source_cell': source_cell,
-                            'target_cell': target_cell
-                        }
+            # 乒乓切換：源小區和目標小區與同一文件中上一個切換事件的正好互換
+            source_array = np.array(source_cells, dtype=object)
+            target_array = np.array(target_cells, dtype=object)
+            ping_pongs = np.zeros(len(timestamps), dtype=bool)
+            ping_pongs[1:] = (
+                (source_array[1:] == target_array[:-1])
+                & (target_array[1:] == source_array[:-1])
+                & np.not_equal(source_array[1:], None)
+                & np.not_equal(target_array[1:], None)
+            )
+            
+            # 只為乒乓切換和切換失敗的事件生成記錄
+            for index in np.flatnonzero(ping_pongs).tolist():
+                self.ping_pong_handovers[entity_id].append({
+                    'timestamp': timestamps[index],
+                    'source_cell': source_cells[index],
+                    'target_cell': target_cells[index]
+                })
+            for index in compress(range(len(timestamps)), failures):
+                self.handover_failures[entity_id].append({
+                    'timestamp': timestamps[index],
+                    'source_cell': source_cells[index],
+                    'target_cell': target_cells[index]
+                })
+            ping_pongs = ping_pongs.tolist()
+            
+            # 記錄切換事件，每個字段一列
+            columns['timestamp'].extend(timestamps)
+            columns['entity_id'].extend(repeat(entity_id, len(timestamps)))
+            columns['source_cell'].extend(source_cells)
+            columns['target_cell'].extend(target_cells)
+            columns['type'].extend(ho_types)
+            columns['delay'].extend(delays)
+            columns['is_failure'].extend(failures)
+            columns['is_ping_pong'].extend(ping_pongs)
+            
+            # 更新切換延遲
+            valid_delays = [delay for delay in delays if delay is not None]
+            if valid_delays:
+                self.handover_delays[entity_id].extend(valid_delays)
+            
+            # 更新切換類型計數
+            self.handover_types[entity_id].update(ho_types)
         
         print("Handover metrics extraction completed")
     
+    @property
+    def handover_events(self):
+        """切換事件列表（每個事件一個字典），按需由列式存儲生成"""
+        return [dict(zip(HANDOVER_EVENT_FIELDS, row)) for row in zip(*self.handover_event_columns.values())]
+    
     def calculate_statistics(self):
-        """計算切換性能指標的統計數據"""
+        """計算切換性能指標的統計數據，結果會被緩存直到再次提取日誌"""
+        if self._statistics is not None:
+            return self._statistics
+        
         statistics = {}
         
         # 計算切換次數
-        handover_counts = Counter([event['entity_id'] for event in self.handover_events])
+        handover_counts = Counter(self.handover_event_columns['entity_id'])
         statistics['handover_counts'] = dict(handover_counts)
         
         # 計算切換成功率
@@ -901,14 +1168,7 @@ class HandoverMetricsCollector:
             if not delays:
                 continue
             
-            statistics['handover_delays'][entity_id] = {
-                'min': min(delays),
-                'max': max(delays),
-                'avg': sum(delays) / len(delays),
-                'median': sorted(delays)[len(delays) // 2],
-                'std': np.std(delays) if len(delays) > 1 else 0,
-                'count': len(delays)
-            }
+            statistics['handover_delays'][entity_id] = _summary_statistics(delays)
         
         # 計算乒乓切換率
         statistics['ping_pong_rates'] = {}
@@ -922,6 +1182,7 @@ class HandoverMetricsCollector:
         for entity_id, type_counter in self.handover_types.items():
             statistics['handover_type_distribution'][entity_id] = dict(type_counter)
         
+        self._statistics = statistics
         return statistics
     
     def plot_metrics(self):
@@ -947,7 +1208,7 @@ class HandoverMetricsCollector:
     
     def _plot_handover_counts(self, charts_dir):
         """繪製切換次數圖表"""
-        handover_counts = Counter([event['entity_id'] for event in self.handover_events])
+        handover_counts = Counter(self.handover_event_columns['entity_id'])
         
         if not handover_counts:
             return
@@ -969,7 +1230,7 @@ class HandoverMetricsCollector:
     
     def _plot_handover_success_rates(self, charts_dir):
         """繪製切換成功率圖表"""
-        handover_counts = Counter([event['entity_id'] for event in self.handover_events])
+        handover_counts = Counter(self.handover_event_columns['entity_id'])
         
         if not handover_counts:
             return
@@ -1028,7 +1289,7 @@ class HandoverMetricsCollector:
     
     def _plot_ping_pong_rates(self, charts_dir):
         """繪製乒乓切換率圖表"""
-        handover_counts = Counter([event['entity_id'] for event in self.handover_events])
+        handover_counts = Counter(self.handover_event_columns['entity_id'])
         
         if not handover_counts:
             return
@@ -1083,12 +1344,10 @@ class HandoverMetricsCollector:
         statistics = self.calculate_statistics()
         
         # 保存統計數據
-        with open(os.path.join(self.output_dir, 'handover_metrics_statistics.json'), 'w') as f:
-            json.dump(statistics, f, indent=2)
+        _dump_json_file(statistics, os.path.join(self.output_dir, 'handover_metrics_statistics.json'))
         
         # 保存切換事件數據
-        with open(os.path.join(self.output_dir, 'handover_events.json'), 'w') as f:
-            json.dump(self.handover_events, f, indent=2)
+        _dump_json_file(self.handover_events, os.path.join(self.output_dir, 'handover_events.json'))
         
         # 保存 CSV 格式的數據
         self._save_csv_data()
@@ -1110,18 +1369,18 @@ class HandoverMetricsCollector:
             header = ['Timestamp', 'Entity ID', 'Source Cell', 'Target Cell', 'Type', 'Delay (ms)', 'Failure', 'Ping-Pong']
             writer.writerow(header)
             
-            # 寫入數據行
-            for event in self.handover_events:
-                writer.writerow([
-                    event['timestamp'],
-                    event['entity_id'],
-                    event['source_cell'],
-                    event['target_cell'],
-                    event['type'],
-                    event['delay'] if event['delay'] is not None else '',
-                    'Yes' if event['is_failure'] else 'No',
-                    'Yes' if event['is_ping_pong'] else 'No'
-                ])
+            # 寫入數據行，直接按列組合，不生成每個事件的字典
+            columns = self.handover_event_columns
+            writer.writerows(zip(
+                columns['timestamp'],
+                columns['entity_id'],
+                columns['source_cell'],
+                columns['target_cell'],
+                columns['type'],
+                ['' if delay is None else delay for delay in columns['delay']],
+                ['Yes' if is_failure else 'No' for is_failure in columns['is_failure']],
+                ['Yes' if is_ping_pong else 'No' for is_ping_pong in columns['is_ping_pong']]
+            ))
         
         # 保存切換統計數據
         statistics = self.calculate_statistics()
@@ -1159,13 +1418,14 @@ class RealTimeMetricsCollector:
         # 確保輸出目錄存在
         os.makedirs(self.output_dir, exist_ok=True)
         
+        # 最大數據點數量
+        self.max_data_points = 1000
+        
         # 初始化數據結構
-        self.metrics = defaultdict(lambda: defaultdict(deque))  # 按實體和指標類型分組的指標值
+        # 按實體和指標類型分組的指標值；定長 deque 在追加時自動丟棄最舊的數據點
+        self.metrics = defaultdict(lambda: defaultdict(lambda: deque(maxlen=self.max_data_points)))
         self.is_running = False
         self.collection_thread = None
-        
-        # 最大數據點數量
-        self.max_data_points = 1000
     
     def start_collection(self, entities=None):
         """開始收集性能指標"""
@@ -1209,7 +1469,7 @@ class RealTimeMetricsCollector:
     def _collect_metrics(self):
         """收集性能指標"""
         # 當前時間戳
-        timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
+        timestamp = datetime.datetime.now().strftime(TIMESTAMP_FORMAT)
         
         # 對於每個實體
         for entity in self.entities:
@@ -1259,12 +1519,8 @@ class RealTimeMetricsCollector:
     
     def _add_metric(self, entity, metric_type, timestamp, value):
         """添加指標值"""
-        # 添加指標值
+        # 添加指標值，超出 max_data_points 的舊數據點由 deque 自動丟棄
         self.metrics[entity][metric_type].append((timestamp, value))
-        
-        # 限制數據點數量
-        while len(self.metrics[entity][metric_type]) > self.max_data_points:
-            self.metrics[entity][metric_type].popleft()
     
     def get_metrics(self, entity=None, metric_type=None):
         """獲取指標值"""
@@ -1303,13 +1559,11 @@ class RealTimeMetricsCollector:
             if metric_type not in entity_metrics or not entity_metrics[metric_type]:
                 continue
             
-            # 提取時間戳和值
-            timestamps = [datetime.datetime.strptime(ts, '%Y-%m-%d %H:%M:%S.%f') for ts, _ in entity_metrics[metric_type]]
-            values = [value for _, value in entity_metrics[metric_type]]
+            # 一次拆分出時間戳和值
+            timestamps, values = zip(*entity_metrics[metric_type])
             
-            # 將時間戳轉換為相對時間（秒）
-            start_time = timestamps[0]
-            relative_times = [(ts - start_time).total_seconds() for ts in timestamps]
+            # 將時間戳轉換為相對時間（秒），由 NumPy 的 datetime64 解析器批量完成
+            relative_times = _relative_seconds(timestamps)
             
             plt.plot(relative_times, values, label=entity)
         
@@ -1326,15 +1580,8 @@ class RealTimeMetricsCollector:
     def save_results(self):
         """保存分析結果"""
         # 保存指標數據
-        with open(os.path.join(self.output_dir, 'real_time_metrics.json'), 'w') as f:
-            # 將不可序列化的對象轉換為列表
-            serializable_metrics = {}
-            for entity, entity_metrics in self.metrics.items():
-                serializable_metrics[entity] = {}
-                for metric_type, values in entity_metrics.items():
-                    serializable_metrics[entity][metric_type] = list(values)
-            
-            json.dump(serializable_metrics, f, indent=2)
+        # deque 在序列化時直接轉換為列表，無需先複製整個字典
+        _dump_json_file(self.metrics, os.path.join(self.output_dir, 'real_time_metrics.json'), default=list)
         
         # 保存 CSV 格式的數據
         self._save_csv_data()
@@ -14,11 +14,32 @@ import csv
 import datetime
 import pyshark
 import asn1tools
-import matplotlib.pyplot as plt
+from matplotlib.artist import setp
+from matplotlib.figure import Figure
 import numpy as np
 import pandas as pd
 from collections import defaultdict, Counter
 from itertools import groupby
+from operator import itemgetter
+
+# 日誌解析用的正則表達式，在模塊載入時編譯一次
+TIMESTAMP_RE = re.compile(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+)')
+RSRP_RE = re.compile(r'RSRP[: =]+(-?\d+\.?\d*)')
+RSRQ_RE = re.compile(r'RSRQ[: =]+(-?\d+\.?\d*)')
+SOURCE_CELL_RE = re.compile(r'from (?:cell|PCI) (\d+)')
+TARGET_CELL_RE = re.compile(r'to (?:cell|PCI) (\d+)')
+UE_ID_RE = re.compile(r'UE(\d+)')
+
+
+def _iter_raw_lines(f):
+    """逐行讀取二進制文件，與文本模式的通用換行一致，單獨的 \\r 也視為換行"""
+    for raw_line in f:
+        # 二進制模式只按 \n 分行，行內剩下的 \r 才需要再拆分
+        if b'\r' in raw_line.rstrip(b'\r\n'):
+            yield from raw_line.replace(b'\r\n', b'\n').split(b'\r')
+        else:
+            yield raw_line
+
 
 class RRCMessageParser:
     """RRC 消息解析器，用於解析 RRC 協議消息的 ASN.1 結構"""
@@ -233,10 +254,16 @@ class LogAnalyzer:
         print(f"Extracting RRC events from {self.log_file}...")
         
         try:
-            with open(self.log_file, 'r') as f:
-                for line in f:
+            # 以字節讀取，只有候選行才解碼為字符串
+            with open(self.log_file, 'rb') as f:
+                for raw_line in _iter_raw_lines(f):
+                    # 大部分日誌行既非 RRC 也非切換事件，先用子串判斷快速跳過
+                    if b'RRC' not in raw_line and b'Handover' not in raw_line:
+                        continue
+                    line = raw_line.decode('utf-8', errors='replace')
+                    
                     # 提取時間戳
-                    timestamp_match = re.search(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+)', line)
+                    timestamp_match = TIMESTAMP_RE.search(line)
                     timestamp = timestamp_match.group(1) if timestamp_match else None
                     
                     # 提取 RRC 相關事件
@@ -260,8 +287,8 @@ class LogAnalyzer:
                         # RRC 測量報告
                         elif 'Measurement Report' in line:
                             # 提取 RSRP/RSRQ 值
-                            rsrp_match = re.search(r'RSRP[: =]+(-?\d+\.?\d*)', line)
-                            rsrq_match = re.search(r'RSRQ[: =]+(-?\d+\.?\d*)', line)
+                            rsrp_match = RSRP_RE.search(line)
+                            rsrq_match = RSRQ_RE.search(line)
                             
                             rsrp = float(rsrp_match.group(1)) if rsrp_match else None
                             rsrq = float(rsrq_match.group(1)) if rsrq_match else None
@@ -293,8 +320,8 @@ class LogAnalyzer:
                     # 提取切換事件
                     elif 'Handover' in line:
                         # 提取源小區和目標小區
-                        source_match = re.search(r'from (?:cell|PCI) (\d+)', line)
-                        target_match = re.search(r'to (?:cell|PCI) (\d+)', line)
+                        source_match = SOURCE_CELL_RE.search(line)
+                        target_match = TARGET_CELL_RE.search(line)
                         
                         source_cell = source_match.group(1) if source_match else None
                         target_cell = target_match.group(1) if target_match else None
@@ -321,7 +348,7 @@ class RRCSequenceAnalyzer:
         self.rrc_events = rrc_events
         self.combined_events = []
         self.sequences = []
-        self.sequence_patterns = {}
+        self.sequence_patterns = Counter()
     
     def combine_events(self):
         """合併 RRC 消息和事件，按時間排序"""
@@ -346,7 +373,7 @@ class RRCSequenceAnalyzer:
             self.combined_events.append(event)
         
         # 按時間排序
-        self.combined_events.sort(key=lambda x: x["timestamp"])
+        self.combined_events.sort(key=itemgetter("timestamp"))
         
         return self.combined_events
     
@@ -379,10 +406,7 @@ class RRCSequenceAnalyzer:
             })
             
             # 更新序列模式計數
-            if sequence_tuple in self.sequence_patterns:
-                self.sequence_patterns[sequence_tuple] += 1
-            else:
-                self.sequence_patterns[sequence_tuple] = 1
+            self.sequence_patterns[sequence_tuple] += 1
         
         return self.sequences
     
@@ -391,11 +415,8 @@ class RRCSequenceAnalyzer:
         if not self.sequence_patterns:
             self.identify_sequences()
         
-        # 按出現次數排序
-        sorted_patterns = sorted(self.sequence_patterns.items(), key=lambda x: x[1], reverse=True)
-        
         # 返回前 N 個最常見的模式
-        return sorted_patterns[:top_n]
+        return self.sequence_patterns.most_common(top_n)
     
     def detect_abnormal_sequences(self, threshold=0.05):
         """檢測異常序列"""
@@ -667,6 +688,19 @@ class RRCTraceAnalyzer:
         # 確保輸出目錄存在
         os.makedirs(self.output_dir, exist_ok=True)
         
+        # 輸出文件路徑
+        self.output_paths = {
+            name: os.path.join(self.output_dir, filename)
+            for name, filename in (
+                ('json', 'rrc_analysis.json'),
+                ('messages_csv', 'rrc_messages.csv'),
+                ('events_csv', 'rrc_events.csv'),
+                ('metrics_csv', 'performance_metrics.csv'),
+                ('report', 'rrc_analysis_report.md'),
+            )
+        }
+        self.charts_dir = os.path.join(self.output_dir, 'charts')
+        
         # 初始化數據結構
         self.rrc_messages = []
         self.rrc_events = []
@@ -739,8 +773,7 @@ class RRCTraceAnalyzer:
     
     def analyze_message_distribution(self):
         """分析 RRC 消息分佈"""
-        message_types = [msg["message_type"] for msg in self.rrc_messages]
-        message_counts = Counter(message_types)
+        message_counts = Counter(map(itemgetter("message_type"), self.rrc_messages))
         
         self.analysis_results["message_distribution"] = dict(message_counts)
         
@@ -748,8 +781,7 @@ class RRCTraceAnalyzer:
     
     def analyze_event_distribution(self):
         """分析 RRC 事件分佈"""
-        event_types = [evt["event_type"] for evt in self.rrc_events]
-        event_counts = Counter(event_types)
+        event_counts = Counter(map(itemgetter("event_type"), self.rrc_events))
         
         self.analysis_results["event_distribution"] = dict(event_counts)
         
@@ -759,16 +791,16 @@ class RRCTraceAnalyzer:
         """分析切換模式"""
         handover_patterns = []
         
-        # 提取切換事件
-        handover_events = [evt for evt in self.rrc_events if evt["event_type"] == "HANDOVER"]
-        
-        # 按 UE 分組
+        # 提取切換事件並按 UE 分組
         ue_handovers = defaultdict(list)
-        for evt in handover_events:
+        for evt in self.rrc_events:
+            if evt["event_type"] != "HANDOVER":
+                continue
+            
             # 嘗試從消息中提取 UE ID
             ue_id = None
             message = evt["message"]
-            ue_match = re.search(r'UE(\d+)', message)
+            ue_match = UE_ID_RE.search(message)
             if ue_match:
                 ue_id = ue_match.group(1)
             
@@ -777,7 +809,7 @@ class RRCTraceAnalyzer:
         # 分析每個 UE 的切換模式
         for ue_id, events in ue_handovers.items():
             # 按時間排序
-            events.sort(key=lambda x: x["timestamp"])
+            events.sort(key=itemgetter("timestamp"))
             
             # 提取切換序列
             handover_sequence = []
@@ -785,12 +817,11 @@ class RRCTraceAnalyzer:
                 if "source_cell" in evt and "target_cell" in evt:
                     handover_sequence.append((evt["source_cell"], evt["target_cell"]))
             
-            # 檢測 ping-pong 切換
-            ping_pong_count = 0
-            for i in range(len(handover_sequence) - 1):
-                if handover_sequence[i][0] == handover_sequence[i+1][1] and \
-                   handover_sequence[i][1] == handover_sequence[i+1][0]:
-                    ping_pong_count += 1
+            # 檢測 ping-pong 切換（下一次切換正好是反向的 source/target 對）
+            ping_pong_count = sum(
+                1 for current, following in zip(handover_sequence, handover_sequence[1:])
+                if current == following[::-1]
+            )
             
             handover_patterns.append({
                 "ue_id": ue_id,
@@ -844,7 +875,7 @@ class RRCTraceAnalyzer:
     def save_results(self):
         """保存分析結果"""
         # 保存 JSON 結果
-        with open(os.path.join(self.output_dir, 'rrc_analysis.json'), 'w') as f:
+        with open(self.output_paths['json'], 'w') as f:
             # 將不可序列化的對象轉換為字符串
             serializable_results = self.convert_to_serializable(self.analysis_results)
             json.dump(serializable_results, f, indent=2)
@@ -873,7 +904,7 @@ class RRCTraceAnalyzer:
         """保存 CSV 格式的結果"""
         # 保存 RRC 消息
         if self.rrc_messages:
-            with open(os.path.join(self.output_dir, 'rrc_messages.csv'), 'w', newline='') as f:
+            with open(self.output_paths['messages_csv'], 'w', newline='') as f:
                 writer = csv.writer(f)
                 writer.writerow(['Timestamp', 'Message Type', 'Key Parameters'])
                 
@@ -883,7 +914,7 @@ class RRCTraceAnalyzer:
         
         # 保存 RRC 事件
         if self.rrc_events:
-            with open(os.path.join(self.output_dir, 'rrc_events.csv'), 'w', newline='') as f:
+            with open(self.output_paths['events_csv'], 'w', newline='') as f:
                 writer = csv.writer(f)
                 writer.writerow(['Timestamp', 'Event Type', 'Message'])
                 
@@ -892,7 +923,7 @@ class RRCTraceAnalyzer:
         
         # 保存性能指標
         if self.performance_metrics:
-            with open(os.path.join(self.output_dir, 'performance_metrics.csv'), 'w', newline='') as f:
+            with open(self.output_paths['metrics_csv'], 'w', newline='') as f:
                 writer = csv.writer(f)
                 writer.writerow(['Metric', 'Min', 'Max', 'Avg', 'Count'])
                 
@@ -902,7 +933,7 @@ class RRCTraceAnalyzer:
     
     def generate_report(self):
         """生成分析報告"""
-        report = f"""# RRC 協議追蹤分析報告
+        parts = [f"""# RRC 協議追蹤分析報告
 
 ## 概述
 
@@ -916,68 +947,68 @@ class RRCTraceAnalyzer:
 
 ## RRC 消息分佈
 
-"""
+"""]
         
         # 添加 RRC 消息分佈
         if 'message_distribution' in self.analysis_results:
-            report += "| 消息類型 | 數量 |\n"
-            report += "|---------|------|\n"
+            parts.append("| 消息類型 | 數量 |\n")
+            parts.append("|---------|------|\n")
             
             for msg_type, count in self.analysis_results['message_distribution'].items():
-                report += f"| {msg_type} | {count} |\n"
+                parts.append(f"| {msg_type} | {count} |\n")
         
-        report += """
+        parts.append("""
 ## RRC 事件分佈
 
-"""
+""")
         
         # 添加 RRC 事件分佈
         if 'event_distribution' in self.analysis_results:
-            report += "| 事件類型 | 數量 |\n"
-            report += "|---------|------|\n"
+            parts.append("| 事件類型 | 數量 |\n")
+            parts.append("|---------|------|\n")
             
             for evt_type, count in self.analysis_results['event_distribution'].items():
-                report += f"| {evt_type} | {count} |\n"
+                parts.append(f"| {evt_type} | {count} |\n")
         
-        report += """
+        parts.append("""
 ## 序列分析
 
 ### 常見序列模式
 
-"""
+""")
         
         # 添加常見序列模式
         if 'sequence_analysis' in self.analysis_results and 'common_sequences' in self.analysis_results['sequence_analysis']:
-            report += "| 序列模式 | 出現次數 |\n"
-            report += "|----------|----------|\n"
+            parts.append("| 序列模式 | 出現次數 |\n")
+            parts.append("|----------|----------|\n")
             
             for pattern, count in self.analysis_results['sequence_analysis']['common_sequences']:
                 pattern_str = ' -> '.join(pattern)
-                report += f"| {pattern_str} | {count} |\n"
+                parts.append(f"| {pattern_str} | {count} |\n")
         
-        report += """
+        parts.append("""
 ### 異常序列模式
 
-"""
+""")
         
         # 添加異常序列模式
         if 'sequence_analysis' in self.analysis_results and 'abnormal_sequences' in self.analysis_results['sequence_analysis']:
-            report += "| 序列模式 | 出現次數 | 頻率 |\n"
-            report += "|----------|----------|------|\n"
+            parts.append("| 序列模式 | 出現次數 | 頻率 |\n")
+            parts.append("|----------|----------|------|\n")
             
             for pattern, data in self.analysis_results['sequence_analysis']['abnormal_sequences'].items():
                 pattern_str = ' -> '.join(pattern)
-                report += f"| {pattern_str} | {data['count']} | {data['frequency']:.4f} |\n"
+                parts.append(f"| {pattern_str} | {data['count']} | {data['frequency']:.4f} |\n")
         
-        report += """
+        parts.append("""
 ## 性能指標
 
-"""
+""")
         
         # 添加性能指標
         if 'performance_metrics' in self.analysis_results:
-            report += "| 指標 | 最小值 | 最大值 | 平均值 | 樣本數 |\n"
-            report += "|------|--------|--------|--------|--------|\n"
+            parts.append("| 指標 | 最小值 | 最大值 | 平均值 | 樣本數 |\n")
+            parts.append("|------|--------|--------|--------|--------|\n")
             
             for metric, data in self.analysis_results['performance_metrics'].items():
                 if isinstance(data, dict) and 'min' in data:
@@ -985,27 +1016,27 @@ class RRCTraceAnalyzer:
                     max_val = f"{data['max']:.3f}" if data['max'] is not None else 'N/A'
                     avg_val = f"{data['avg']:.3f}" if data['avg'] is not None else 'N/A'
                     
-                    report += f"| {metric} | {min_val} | {max_val} | {avg_val} | {data['count']} |\n"
+                    parts.append(f"| {metric} | {min_val} | {max_val} | {avg_val} | {data['count']} |\n")
             
             # 添加切換成功率
             if 'handover_success_rate' in self.analysis_results['performance_metrics']:
                 ho_data = self.analysis_results['performance_metrics']['handover_success_rate']
-                report += f"\n切換成功率: {ho_data['rate']:.2%} ({ho_data['successes']}/{ho_data['attempts']})\n"
+                parts.append(f"\n切換成功率: {ho_data['rate']:.2%} ({ho_data['successes']}/{ho_data['attempts']})\n")
         
-        report += """
+        parts.append("""
 ## 切換模式分析
 
-"""
+""")
         
         # 添加切換模式分析
         if 'handover_patterns' in self.analysis_results:
-            report += "| UE ID | 切換次數 | Ping-Pong 切換次數 |\n"
-            report += "|-------|----------|--------------------|\n"
+            parts.append("| UE ID | 切換次數 | Ping-Pong 切換次數 |\n")
+            parts.append("|-------|----------|--------------------|\n")
             
             for pattern in self.analysis_results['handover_patterns']:
-                report += f"| {pattern['ue_id'] or 'Unknown'} | {pattern['handover_count']} | {pattern['ping_pong_count']} |\n"
+                parts.append(f"| {pattern['ue_id'] or 'Unknown'} | {pattern['handover_count']} | {pattern['ping_pong_count']} |\n")
         
-        report += """
+        parts.append("""
 ## 結論與建議
 
 基於上述分析，我們得出以下結論：
@@ -1026,13 +1057,13 @@ class RRCTraceAnalyzer:
             self.analysis_results.get('performance_metrics', {}).get('handover_delay', {}).get('avg', 0) or 0,
             self.analysis_results.get('performance_metrics', {}).get('measurement_to_handover_time', {}).get('avg', 0) or 0,
             self.analysis_results.get('performance_metrics', {}).get('handover_success_rate', {}).get('rate', 0) or 0
-        )
+        ))
         
         # 保存報告
-        with open(os.path.join(self.output_dir, 'rrc_analysis_report.md'), 'w') as f:
-            f.write(report)
+        with open(self.output_paths['report'], 'w', encoding='utf-8') as f:
+            f.writelines(parts)
         
-        print(f"Analysis report saved to {os.path.join(self.output_dir, 'rrc_analysis_report.md')}")
+        print(f"Analysis report saved to {self.output_paths['report']}")
         
         # 生成圖表
         self.generate_charts()
@@ -1040,115 +1071,95 @@ class RRCTraceAnalyzer:
     def generate_charts(self):
         """生成分析圖表"""
         # 創建圖表目錄
-        charts_dir = os.path.join(self.output_dir, 'charts')
+        charts_dir = self.charts_dir
         os.makedirs(charts_dir, exist_ok=True)
         
-        # 生成 RRC 消息分佈圖
-        if 'message_distribution' in self.analysis_results:
-            self.plot_message_distribution(charts_dir)
-        
-        # 生成 RRC 事件分佈圖
-        if 'event_distribution' in self.analysis_results:
-            self.plot_event_distribution(charts_dir)
-        
-        # 生成性能指標圖
-        if 'performance_metrics' in self.analysis_results:
-            self.plot_performance_metrics(charts_dir)
+        # RRC 消息分佈、事件分佈、性能指標和切換模式圖
+        plots = [
+            plot for key, plot in (
+                ('message_distribution', self.plot_message_distribution),
+                ('event_distribution', self.plot_event_distribution),
+                ('performance_metrics', self.plot_performance_metrics),
+                ('handover_patterns', self.plot_handover_patterns),
+            )
+            if key in self.analysis_results
+        ]
         
-        # 生成切換模式圖
-        if 'handover_patterns' in self.analysis_results:
-            self.plot_handover_patterns(charts_dir)
+        # 每張圖使用獨立的 Figure，不經過 pyplot 的全局狀態；matplotlib 不是線程安全的，
+        # 所以依次渲染
+        for plot in plots:
+            plot(charts_dir)
     
     def plot_message_distribution(self, charts_dir):
         """繪製 RRC 消息分佈圖"""
         message_dist = self.analysis_results['message_distribution']
         
-        plt.figure(figsize=(10, 6))
-        plt.bar(message_dist.keys(), message_dist.values())
-        plt.title('RRC Message Distribution')
-        plt.xlabel('Message Type')
-        plt.ylabel('Count')
-        plt.xticks(rotation=45, ha='right')
-        plt.tight_layout()
+        fig = Figure(figsize=(10, 6))
+        ax = fig.subplots()
+        ax.bar(list(message_dist.keys()), list(message_dist.values()))
+        ax.set_title('RRC Message Distribution')
+        ax.set_xlabel('Message Type')
+        ax.set_ylabel('Count')
+        setp(ax.get_xticklabels(), rotation=45, ha='right')
+        fig.tight_layout()
         
-        plt.savefig(os.path.join(charts_dir, 'message_distribution.png'))
-        plt.close()
+        fig.savefig(os.path.join(charts_dir, 'message_distribution.png'))
     
     def plot_event_distribution(self, charts_dir):
         """繪製 RRC 事件分佈圖"""
         event_dist = self.analysis_results['event_distribution']
         
-        plt.figure(figsize=(10, 6))
-        plt.bar(event_dist.keys(), event_dist.values())
-        plt.title('RRC Event Distribution')
-        plt.xlabel('Event Type')
-        plt.ylabel('Count')
-        plt.xticks(rotation=45, ha='right')
-        plt.tight_layout()
+        fig = Figure(figsize=(10, 6))
+        ax = fig.subplots()
+        ax.bar(list(event_dist.keys()), list(event_dist.values()))
+        ax.set_title('RRC Event Distribution')
+        ax.set_xlabel('Event Type')
+        ax.set_ylabel('Count')
+        setp(ax.get_xticklabels(), rotation=45, ha='right')
+        fig.tight_layout()
         
-        plt.savefig(os.path.join(charts_dir, 'event_distribution.png'))
-        plt.close()
+        fig.savefig(os.path.join(charts_dir, 'event_distribution.png'))
     
     def plot_performance_metrics(self, charts_dir):
         """繪製性能指標圖"""
         metrics = self.analysis_results['performance_metrics']
         
-        # 繪製連接建立時間分佈
-        if 'connection_setup_time' in metrics and metrics['connection_setup_time']['values']:
-            plt.figure(figsize=(10, 6))
-            plt.hist(metrics['connection_setup_time']['values'], bins=20)
-            plt.title('RRC Connection Setup Time Distribution')
-            plt.xlabel('Time (seconds)')
-            plt.ylabel('Frequency')
-            plt.axvline(metrics['connection_setup_time']['avg'], color='r', linestyle='dashed', linewidth=2, label=f"Average: {metrics['connection_setup_time']['avg']:.3f}s")
-            plt.legend()
-            plt.tight_layout()
-            
-            plt.savefig(os.path.join(charts_dir, 'connection_setup_time.png'))
-            plt.close()
-        
-        # 繪製切換延遲分佈
-        if 'handover_delay' in metrics and metrics['handover_delay']['values']:
-            plt.figure(figsize=(10, 6))
-            plt.hist(metrics['handover_delay']['values'], bins=20)
-            plt.title('Handover Delay Distribution')
-            plt.xlabel('Time (seconds)')
-            plt.ylabel('Frequency')
-            plt.axvline(metrics['handover_delay']['avg'], color='r', linestyle='dashed', linewidth=2, label=f"Average: {metrics['handover_delay']['avg']:.3f}s")
-            plt.legend()
-            plt.tight_layout()
+        # 連接建立時間、切換延遲、測量報告到切換執行的時間分佈
+        histograms = [
+            ('connection_setup_time', 'RRC Connection Setup Time Distribution'),
+            ('handover_delay', 'Handover Delay Distribution'),
+            ('measurement_to_handover_time', 'Measurement to Handover Time Distribution'),
+        ]
+        for metric_name, title in histograms:
+            if metric_name not in metrics or not metrics[metric_name]['values']:
+                continue
             
-            plt.savefig(os.path.join(charts_dir, 'handover_delay.png'))
-            plt.close()
-        
-        # 繪製測量報告到切換執行的時間分佈
-        if 'measurement_to_handover_time' in metrics and metrics['measurement_to_handover_time']['values']:
-            plt.figure(figsize=(10, 6))
-            plt.hist(metrics['measurement_to_handover_time']['values'], bins=20)
-            plt.title('Measurement to Handover Time Distribution')
-            plt.xlabel('Time (seconds)')
-            plt.ylabel('Frequency')
-            plt.axvline(metrics['measurement_to_handover_time']['avg'], color='r', linestyle='dashed', linewidth=2, label=f"Average: {metrics['measurement_to_handover_time']['avg']:.3f}s")
-            plt.legend()
-            plt.tight_layout()
+            fig = Figure(figsize=(10, 6))
+            ax = fig.subplots()
+            ax.hist(metrics[metric_name]['values'], bins=20)
+            ax.set_title(title)
+            ax.set_xlabel('Time (seconds)')
+            ax.set_ylabel('Frequency')
+            ax.axvline(metrics[metric_name]['avg'], color='r', linestyle='dashed', linewidth=2, label=f"Average: {metrics[metric_name]['avg']:.3f}s")
+            ax.legend()
+            fig.tight_layout()
             
-            plt.savefig(os.path.join(charts_dir, 'measurement_to_handover_time.png'))
-            plt.close()
+            fig.savefig(os.path.join(charts_dir, f'{metric_name}.png'))
         
         # 繪製切換成功率
         if 'handover_success_rate' in metrics:
             ho_data = metrics['handover_success_rate']
             
-            plt.figure(figsize=(8, 8))
-            plt.pie([ho_data['successes'], ho_data['attempts'] - ho_data['successes']], 
+            fig = Figure(figsize=(8, 8))
+            ax = fig.subplots()
+            ax.pie([ho_data['successes'], ho_data['attempts'] - ho_data['successes']], 
                    labels=['Success', 'Failure'], 
                    autopct='%1.1f%%', 
                    colors=['#4CAF50', '#F44336'])
-            plt.title('Handover Success Rate')
-            plt.tight_layout()
+            ax.set_title('Handover Success Rate')
+            fig.tight_layout()
             
-            plt.savefig(os.path.join(charts_dir, 'handover_success_rate.png'))
-            plt.close()
+            fig.savefig(os.path.join(charts_dir, 'handover_success_rate.png'))
     
     def plot_handover_patterns(self, charts_dir):
         """繪製切換模式圖"""
@@ -1159,23 +1170,24 @@ class RRCTraceAnalyzer:
         ho_counts = [p['handover_count'] for p in patterns]
         pp_counts = [p['ping_pong_count'] for p in patterns]
         
-        plt.figure(figsize=(10, 6))
+        fig = Figure(figsize=(10, 6))
+        ax = fig.subplots()
         
         x = np.arange(len(ue_ids))
         width = 0.35
         
-        plt.bar(x - width/2, ho_counts, width, label='Total Handovers')
-        plt.bar(x + width/2, pp_counts, width, label='Ping-Pong Handovers')
+        ax.bar(x - width/2, ho_counts, width, label='Total Handovers')
+        ax.bar(x + width/2, pp_counts, width, label='Ping-Pong Handovers')
         
-        plt.title('Handover Patterns by UE')
-        plt.xlabel('UE ID')
-        plt.ylabel('Count')
-        plt.xticks(x, ue_ids)
-        plt.legend()
-        plt.tight_layout()
+        ax.set_title('Handover Patterns by UE')
+        ax.set_xlabel('UE ID')
+        ax.set_ylabel('Count')
+        ax.set_xticks(x)
+        ax.set_xticklabels(ue_ids)
+        ax.legend()
+        fig.tight_layout()
         
-        plt.savefig(os.path.join(charts_dir, 'handover_patterns.png'))
-        plt.close()
+        fig.savefig(os.path.join(charts_dir, 'handover_patterns.png'))
 
 def main():
     parser = argparse.ArgumentParser(description="Enhanced RRC Trace Analyzer")
@@ -21,6 +21,7 @@ from channel_models import (
     ChannelModel,
     SimplifiedChannelModel,
     ExternalChannelModelPlaceholder,
+    serving_gnb,
 )
 
 # --- 網絡實體類 --- 
@@ -35,6 +36,27 @@ class GNB:
         # self.coverage_radius = coverage_radius # 移除固定的覆蓋半徑，由信道模型決定
         self.connected_ues = []
     
+    @property
+    def frequency(self):
+        return self._frequency
+
+    @frequency.setter
+    def frequency(self, frequency):
+        # 路徑損耗中與頻率相關的常數項只在頻率改變時重新計算
+        self._frequency = frequency
+        self.path_loss_constant = 32.4 + 20 * math.log10(frequency)
+        self.path_loss_linear = 10 ** (self.path_loss_constant / 10.0)
+
+    @property
+    def power(self):
+        return self._power
+
+    @power.setter
+    def power(self, power):
+        # 同時保存線性功率 (mW)，SINR 計算直接使用
+        self._power = power
+        self.power_linear = 10 ** (power / 10.0)
+
     # 移除 calculate_rsrp 和 is_in_coverage，這些由信道模型處理
     # def calculate_rsrp(self, ue_position):
     # def is_in_coverage(self, ue_position):
@@ -198,7 +220,7 @@ class UE:
             # 計算到目標的距離和方向
             dx = target_x - self.position.x
             dy = target_y - self.position.y
-            distance_to_target = math.sqrt(dx*dx + dy*dy)
+            distance_to_target = math.hypot(dx, dy)
             
             if distance_to_target > 0:
                 direction = math.atan2(dy, dx)
@@ -296,17 +318,22 @@ class UE:
 
 class NetworkSimulator:
     """網絡模擬器，管理 gNB 和 UE，並模擬它們的行為"""
-    def __init__(self, config_dir, simulation_area=(1000, 1000), channel_model: ChannelModel = SimplifiedChannelModel()):
+    def __init__(self, config_dir, simulation_area=(1000, 1000), channel_model: ChannelModel = None, seed=None):
         self.config_dir = config_dir
         self.simulation_area = simulation_area  # meters
         self.gnbs = []
         self.ues = []
+        # 所有 UE 的座標，(N, 2) 陣列，UE.position 直接讀寫其中一列
+        self.ue_positions = np.empty((0, 2))
         self.time_step = 1.0  # seconds
         self.simulation_time = 0.0  # seconds
         self.is_running = False
         self.event_log = []
         self.rsrp_log = []
-        self.channel_model = channel_model # 使用注入的信道模型
+        # 使用注入的信道模型；未指定時按 seed 建立，衰落亂數與 random 模組互相獨立
+        if channel_model is None:
+            channel_model = SimplifiedChannelModel(seed=seed)
+        self.channel_model = channel_model
         
         # 創建輸出目錄
         self.output_dir = '/home/eezim/workspace/srsRAN_5G/mobility_data'
@@ -331,6 +358,7 @@ class NetworkSimulator:
             UE(5, Position(730, 230), 'group', 1.2, os.path.join(self.config_dir, 'ue/ue5.conf')),
             UE(6, Position(500, 500), 'random_walk', 0.8, os.path.join(self.config_dir, 'ue/ue6.conf'))
         ]
+        self.bind_ue_positions()
         
         # 設置 UE4 的軌跡
         waypoints = [(750, 750), (750, 250), (250, 250), (250, 750), (750, 750)]
@@ -339,16 +367,14 @@ class NetworkSimulator:
         # 設置 UE5 的群組中心
         self.ues[4].set_group_center(self.ues[1])
         
-        # 初始連接 (使用信道模型)
-        for ue in self.ues:
+        # 初始連接 (使用信道模型，一次算出所有 gNB/UE 組合的 RSRP)
+        rsrp_matrix = self.channel_model.calculate_rsrp_matrix(self.gnbs, self.ue_positions)
+        best_index = serving_gnb(rsrp_matrix, threshold=-110)
+        for i, ue in enumerate(self.ues):
             best_gnb = None
-            best_rsrp = -float('inf')
-            
-            for gnb in self.gnbs:
-                rsrp = self.channel_model.calculate_rsrp(gnb, ue.position)
-                if rsrp > best_rsrp and self.channel_model.is_in_coverage(gnb, ue.position):
-                    best_rsrp = rsrp
-                    best_gnb = gnb
+            if best_index[i] >= 0:
+                best_gnb = self.gnbs[best_index[i]]
+                best_rsrp = float(rsrp_matrix[best_index[i], i])
             
             if best_gnb:
                 ue.connect_to_gnb(best_gnb)
@@ -356,6 +382,12 @@ class NetworkSimulator:
             else:
                 self.log_event(f"UE{ue.ue_id} could not find initial serving gNB")
 
+    def bind_ue_positions(self):
+        """把所有 UE 的位置集中到 ue_positions 陣列中"""
+        self.ue_positions = np.array([ue.position.xy for ue in self.ues], dtype=float).reshape(-1, 2)
+        for i, ue in enumerate(self.ues):
+            ue.position = Position.from_row(self.ue_positions, i)
+
     def log_event(self, message):
         """記錄事件"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
@@ -384,17 +416,23 @@ class NetworkSimulator:
         a3_offset = 3  # dB, A3 事件偏移
         coverage_threshold = -110 # dBm, 最低覆蓋 RSRP
 
-        for ue in self.ues:
+        # 每個時間步只計算一次 (G, N) RSRP 矩陣，切換與覆蓋判斷都使用同一組測量值
+        rsrp_matrix = self.channel_model.calculate_rsrp_matrix(self.gnbs, self.ue_positions)
+        reconnect_index = serving_gnb(rsrp_matrix, threshold=coverage_threshold)
+        rsrp_columns = rsrp_matrix.T.tolist()
+
+        for i, ue in enumerate(self.ues):
+            rsrp_by_gnb = dict(zip(self.gnbs, rsrp_columns[i]))
+
             # 計算當前連接的 RSRP
             current_rsrp = -float('inf')
             if ue.connected_gnb:
-                current_rsrp = self.channel_model.calculate_rsrp(ue.connected_gnb, ue.position)
+                current_rsrp = rsrp_by_gnb[ue.connected_gnb]
                 self.log_rsrp(ue, ue.connected_gnb, current_rsrp)
             
             # 計算所有 gNB 的 RSRP
             rsrp_measurements = []
-            for gnb in self.gnbs:
-                 rsrp = self.channel_model.calculate_rsrp(gnb, ue.position)
+            for gnb, rsrp in rsrp_by_gnb.items():
                  if gnb != ue.connected_gnb:
                      self.log_rsrp(ue, gnb, rsrp)
                  # 只有當 RSRP 高於某個閾值時才考慮作為潛在目標
@@ -427,18 +465,15 @@ class NetworkSimulator:
                  self.log_event(f"Handover: UE{ue.ue_id} from gNB{old_gnb_id} to gNB{best_candidate_gnb.gnb_id}, RSRP: {current_rsrp:.2f} -> {best_candidate_rsrp:.2f} dBm")
             
             # 檢查是否脫網 (基於覆蓋閾值)
-            if ue.connected_gnb and not self.channel_model.is_in_coverage(ue.connected_gnb, ue.position, threshold=coverage_threshold):
+            if ue.connected_gnb and rsrp_by_gnb[ue.connected_gnb] < coverage_threshold:
                 old_gnb_id = ue.connected_gnb.gnb_id
-                self.log_event(f"UE{ue.ue_id} out of coverage from gNB{old_gnb_id} (RSRP {current_rsrp:.2f} < {coverage_threshold} dBm)")
+                self.log_event(f"UE{ue.ue_id} out of coverage from gNB{old_gnb_id} (RSRP {rsrp_by_gnb[ue.connected_gnb]:.2f} < {coverage_threshold} dBm)")
                 ue.connect_to_gnb(None) # 斷開連接
                 # 嘗試重新連接到其他基站
                 best_reconnect_gnb = None
-                best_reconnect_rsrp = -float('inf')
-                for gnb in self.gnbs:
-                    rsrp = self.channel_model.calculate_rsrp(gnb, ue.position)
-                    if rsrp > best_reconnect_rsrp and self.channel_model.is_in_coverage(gnb, ue.position, threshold=coverage_threshold):
-                        best_reconnect_rsrp = rsrp
-                        best_reconnect_gnb = gnb
+                if reconnect_index[i] >= 0:
+                    best_reconnect_gnb = self.gnbs[reconnect_index[i]]
+                    best_reconnect_rsrp = rsrp_by_gnb[best_reconnect_gnb]
                 if best_reconnect_gnb:
                     ue.connect_to_gnb(best_reconnect_gnb)
                     self.log_event(f"UE{ue.ue_id} reconnected to gNB{best_reconnect_gnb.gnb_id} with RSRP {best_reconnect_rsrp:.2f} dBm")
@@ -486,7 +521,8 @@ class NetworkSimulator:
                 for ue in self.ues:
                     ue.move(self.time_step, self.simulation_area)
                 
-                # 更新連接
+                # 每個時間步重新抽取一次衰落，再更新連接
+                self.channel_model.refresh_fading((len(self.gnbs), len(self.ues)))
                 self.update_connections()
                 
                 # 隨機事件
@@ -602,8 +638,13 @@ def main():
     parser.add_argument("--duration", type=int, default=120, help="Simulation duration in seconds")
     parser.add_argument("--time-step", type=float, default=1.0, help="Simulation time step in seconds")
     parser.add_argument("--channel-model", choices=["simplified", "external"], default="simplified", help="Channel model to use")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for mobility and channel fading")
     args = parser.parse_args()
 
+    # 移動模型使用 random 模組，衰落使用信道模型自己的亂數產生器，兩者都需要設定種子
+    if args.seed is not None:
+        random.seed(args.seed)
+
     # 選擇信道模型
     if args.channel_model == "external":
         # 在這裡實例化並配置外部信道模型 API
@@ -611,7 +652,7 @@ def main():
         # channel_model = ExternalChannelModelPlaceholder(external_api)
         channel_model = ExternalChannelModelPlaceholder() # 使用佔位符
     else:
-        channel_model = SimplifiedChannelModel()
+        channel_model = SimplifiedChannelModel(seed=args.seed)
 
     simulator = NetworkSimulator(args.config_dir, channel_model=channel_model)
     simulator.time_step = args.time_step
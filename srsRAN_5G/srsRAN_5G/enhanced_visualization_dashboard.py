@@ -8,11 +8,11 @@ import dash
 from dash import dcc, html, Input, Output, State
 import plotly.graph_objects as go
 import plotly.express as px
-import pandas as pd
+import plotly.io as pio
 import os
 import json
 import datetime
-from data_utils import load_json_data, load_csv_data
+from data_utils import load_json_data, load_csv_data, parse_timestamp_column
 
 # --- 數據準備 ---
 
@@ -39,6 +39,11 @@ ul_lat_df = load_csv_data(os.path.join(METRICS_DIR, "ul_latency_data.csv"))
 handover_stats = load_json_data(os.path.join(METRICS_DIR, "handover_metrics_statistics.json"))
 handover_events_df = load_csv_data(os.path.join(METRICS_DIR, "handover_events.csv"))
 
+# 時間戳在加載時一次性轉換，回調中不再重複解析
+for metric_df in (rsrp_df, rsrq_df, sinr_df, cqi_df, bler_df,
+                  dl_tp_df, ul_tp_df, dl_lat_df, ul_lat_df, handover_events_df):
+    parse_timestamp_column(metric_df)
+
 # 獲取可用的 UE 和 gNB 列表
 all_ues = set()
 all_gnbs = set()
@@ -67,6 +72,24 @@ all_ues = sorted(list(all_ues))
 all_gnbs = sorted(list(all_gnbs))
 all_entities = sorted(list(all_ues) + list(all_gnbs))
 
+# --- 圖表定義 ---
+
+# 每個時間序列圖表：(圖表 ID, 數據, 數值列, 標題, Y 軸標籤)
+RADIO_CHARTS = [
+    ('rsrp-time-series', rsrp_df, 'RSRP', 'RSRP 時間序列', 'RSRP (dBm)'),
+    ('rsrq-time-series', rsrq_df, 'RSRQ', 'RSRQ 時間序列', 'RSRQ (dB)'),
+    ('sinr-time-series', sinr_df, 'SINR', 'SINR 時間序列', 'SINR (dB)'),
+    ('cqi-time-series', cqi_df, 'CQI', 'CQI 時間序列', 'CQI'),
+    ('bler-time-series', bler_df, 'BLER', 'BLER 時間序列', 'BLER (%)'),
+]
+
+MAC_CHARTS = [
+    ('dl-throughput-time-series', dl_tp_df, 'DL Throughput (Mbps)', '下行吞吐量時間序列', '吞吐量 (Mbps)'),
+    ('ul-throughput-time-series', ul_tp_df, 'UL Throughput (Mbps)', '上行吞吐量時間序列', '吞吐量 (Mbps)'),
+    ('dl-latency-time-series', dl_lat_df, 'DL Latency (ms)', '下行延遲時間序列', '延遲 (ms)'),
+    ('ul-latency-time-series', ul_lat_df, 'UL Latency (ms)', '上行延遲時間序列', '延遲 (ms)'),
+]
+
 # --- Dash 應用程序初始化 ---
 
 app = dash.Dash(__name__, suppress_callback_exceptions=True)
@@ -106,38 +129,26 @@ app.layout = html.Div([
     html.Div(id='tabs-content')
 ])
 
+# --- 選項卡佈局 ---
+
+def chart_rows(chart_ids):
+    """按圖表列表生成佈局，每行並排放置兩個圖表"""
+    rows = []
+    for i in range(0, len(chart_ids), 2):
+        row = [html.Div([dcc.Graph(id=chart_ids[i])], style={'width': '49%', 'display': 'inline-block'})]
+        if i + 1 < len(chart_ids):
+            row.append(html.Div([dcc.Graph(id=chart_ids[i + 1])],
+                                style={'width': '49%', 'display': 'inline-block', 'float': 'right'}))
+        rows.append(html.Div(row))
+    return rows
+
 # --- 無線指標選項卡佈局 ---
 
-radio_tab_layout = html.Div([
-    html.H3("無線指標"),
-    html.Div([
-        html.Div([dcc.Graph(id='rsrp-time-series')], style={'width': '49%', 'display': 'inline-block'}),
-        html.Div([dcc.Graph(id='rsrq-time-series')], style={'width': '49%', 'display': 'inline-block', 'float': 'right'}),
-    ]),
-    html.Div([
-        html.Div([dcc.Graph(id='sinr-time-series')], style={'width': '49%', 'display': 'inline-block'}),
-        html.Div([dcc.Graph(id='cqi-time-series')], style={'width': '49%', 'display': 'inline-block', 'float': 'right'}),
-    ]),
-    html.Div([
-        html.Div([dcc.Graph(id='bler-time-series')], style={'width': '49%', 'display': 'inline-block'}),
-        # 可以添加更多圖表，例如箱線圖
-    ]),
-])
+radio_tab_layout = html.Div([html.H3("無線指標")] + chart_rows([chart[0] for chart in RADIO_CHARTS]))
 
 # --- MAC 層指標選項卡佈局 ---
 
-mac_tab_layout = html.Div([
-    html.H3("MAC 層指標"),
-    html.Div([
-        html.Div([dcc.Graph(id='dl-throughput-time-series')], style={'width': '49%', 'display': 'inline-block'}),
-        html.Div([dcc.Graph(id='ul-throughput-time-series')], style={'width': '49%', 'display': 'inline-block', 'float': 'right'}),
-    ]),
-    html.Div([
-        html.Div([dcc.Graph(id='dl-latency-time-series')], style={'width': '49%', 'display': 'inline-block'}),
-        html.Div([dcc.Graph(id='ul-latency-time-series')], style={'width': '49%', 'display': 'inline-block', 'float': 'right'}),
-    ]),
-    # 可以添加更多圖表，例如 RB 利用率、MCS 等
-])
+mac_tab_layout = html.Div([html.H3("MAC 層指標")] + chart_rows([chart[0] for chart in MAC_CHARTS]))
 
 # --- 切換性能選項卡佈局 ---
 
@@ -169,140 +180,73 @@ def render_tab_content(tab):
 
 # --- 回調函數：更新無線指標圖表 ---
 
+# go.Figure 會自動套用默認模板，直接構建的字典需要顯式帶上，保持與 px 圖表一致的樣式
+FIGURE_TEMPLATE = pio.templates[pio.templates.default].to_plotly_json()
+
+def figure_dict(traces, title, x_label, y_label, y_range=None, **layout):
+    """直接構建 Plotly 圖表字典，省去 graph_objects 的對象構建和屬性校驗"""
+    yaxis = {'title': {'text': y_label}}
+    if y_range is not None:
+        yaxis['range'] = y_range
+    layout.update(title={'text': title}, xaxis={'title': {'text': x_label}}, yaxis=yaxis,
+                  template=FIGURE_TEMPLATE)
+    return {'data': traces, 'layout': layout}
+
 def create_time_series_figure(df, selected_entities, y_col, title, y_label):
     """創建時間序列圖的通用函數"""
-    fig = go.Figure()
-    if df is not None and not df.empty and selected_entities:
-        # 確保 Timestamp 列是 datetime 類型
-        if 'Timestamp' in df.columns:
-            try:
-                df['Timestamp'] = pd.to_datetime(df['Timestamp'], errors='coerce')
-                df = df.dropna(subset=['Timestamp'])
-            except Exception as e:
-                print(f"Error converting Timestamp column: {e}")
-                return fig # 返回空圖
-        else:
-            return fig # 返回空圖
+    traces = []
+    # Timestamp 列已在加載時轉換為 datetime 類型
+    if df is not None and not df.empty and selected_entities and 'Timestamp' in df.columns:
+        df = df.dropna(subset=['Timestamp'])
         
         # 根據實體 ID 列名（可能是 UE ID 或 Entity ID）進行過濾
         id_col = 'UE ID' if 'UE ID' in df.columns else 'Entity ID' if 'Entity ID' in df.columns else None
         
         if id_col:
-            filtered_df = df[df[id_col].isin(selected_entities)]
+            # 只排序一次並按實體分組，不再為每個實體重複做布爾篩選
+            filtered_df = df[df[id_col].isin(selected_entities)].sort_values('Timestamp', kind='stable')
+            entity_groups = dict(tuple(filtered_df.groupby(id_col, sort=False)))
             
             for entity in selected_entities:
-                entity_df = filtered_df[filtered_df[id_col] == entity].sort_values('Timestamp')
-                if not entity_df.empty:
-                    fig.add_trace(go.Scatter(x=entity_df['Timestamp'], y=entity_df[y_col], mode='lines+markers', name=entity))
-        
-    fig.update_layout(
-        title=title,
-        xaxis_title="時間",
-        yaxis_title=y_label,
-        legend_title="實體 ID",
-        hovermode="x unified"
-    )
-    return fig
-
-@app.callback(
-    Output('rsrp-time-series', 'figure'),
-    Input('entity-selector', 'value')
-)
-def update_rsrp_chart(selected_entities):
-    return create_time_series_figure(rsrp_df, selected_entities, 'RSRP', 'RSRP 時間序列', 'RSRP (dBm)')
-
-@app.callback(
-    Output('rsrq-time-series', 'figure'),
-    Input('entity-selector', 'value')
-)
-def update_rsrq_chart(selected_entities):
-    return create_time_series_figure(rsrq_df, selected_entities, 'RSRQ', 'RSRQ 時間序列', 'RSRQ (dB)')
-
-@app.callback(
-    Output('sinr-time-series', 'figure'),
-    Input('entity-selector', 'value')
-)
-def update_sinr_chart(selected_entities):
-    return create_time_series_figure(sinr_df, selected_entities, 'SINR', 'SINR 時間序列', 'SINR (dB)')
-
-@app.callback(
-    Output('cqi-time-series', 'figure'),
-    Input('entity-selector', 'value')
-)
-def update_cqi_chart(selected_entities):
-    return create_time_series_figure(cqi_df, selected_entities, 'CQI', 'CQI 時間序列', 'CQI')
+                entity_df = entity_groups.get(entity)
+                if entity_df is not None:
+                    traces.append({'type': 'scatter', 'x': entity_df['Timestamp'], 'y': entity_df[y_col],
+                                   'mode': 'lines+markers', 'name': entity})
+    
+    return figure_dict(traces, title, "時間", y_label,
+                       legend={'title': {'text': "實體 ID"}}, hovermode="x unified")
 
+# 同一選項卡的圖表在一次回調中更新，實體選擇變化時只需一次請求和一次響應
 @app.callback(
-    Output('bler-time-series', 'figure'),
+    [Output(chart_id, 'figure') for chart_id, *_ in RADIO_CHARTS],
     Input('entity-selector', 'value')
 )
-def update_bler_chart(selected_entities):
-    return create_time_series_figure(bler_df, selected_entities, 'BLER', 'BLER 時間序列', 'BLER (%)')
+def update_radio_charts(selected_entities):
+    return [create_time_series_figure(df, selected_entities, y_col, title, y_label)
+            for _, df, y_col, title, y_label in RADIO_CHARTS]
 
 # --- 回調函數：更新 MAC 指標圖表 ---
 
 @app.callback(
-    Output('dl-throughput-time-series', 'figure'),
+    [Output(chart_id, 'figure') for chart_id, *_ in MAC_CHARTS],
     Input('entity-selector', 'value')
 )
-def update_dl_throughput_chart(selected_entities):
-    return create_time_series_figure(dl_tp_df, selected_entities, 'DL Throughput (Mbps)', '下行吞吐量時間序列', '吞吐量 (Mbps)')
-
-@app.callback(
-    Output('ul-throughput-time-series', 'figure'),
-    Input('entity-selector', 'value')
-)
-def update_ul_throughput_chart(selected_entities):
-    return create_time_series_figure(ul_tp_df, selected_entities, 'UL Throughput (Mbps)', '上行吞吐量時間序列', '吞吐量 (Mbps)')
-
-@app.callback(
-    Output('dl-latency-time-series', 'figure'),
-    Input('entity-selector', 'value')
-)
-def update_dl_latency_chart(selected_entities):
-    return create_time_series_figure(dl_lat_df, selected_entities, 'DL Latency (ms)', '下行延遲時間序列', '延遲 (ms)')
-
-@app.callback(
-    Output('ul-latency-time-series', 'figure'),
-    Input('entity-selector', 'value')
-)
-def update_ul_latency_chart(selected_entities):
-    return create_time_series_figure(ul_lat_df, selected_entities, 'UL Latency (ms)', '上行延遲時間序列', '延遲 (ms)')
+def update_mac_charts(selected_entities):
+    return [create_time_series_figure(df, selected_entities, y_col, title, y_label)
+            for _, df, y_col, title, y_label in MAC_CHARTS]
 
 # --- 回調函數：更新切換性能圖表 ---
 
-@app.callback(
-    Output('handover-counts-bar', 'figure'),
-    Input('entity-selector', 'value')
-)
-def update_handover_counts_chart(selected_entities):
-    fig = go.Figure()
-    if handover_stats and 'handover_counts' in handover_stats and selected_entities:
-        counts = {entity: handover_stats['handover_counts'].get(entity, 0) for entity in selected_entities}
-        if counts:
-            fig.add_trace(go.Bar(x=list(counts.keys()), y=list(counts.values())))
-    fig.update_layout(title="切換次數", xaxis_title="實體 ID", yaxis_title="次數")
-    return fig
-
-@app.callback(
-    Output('handover-success-rate-bar', 'figure'),
-    Input('entity-selector', 'value')
-)
-def update_handover_success_rate_chart(selected_entities):
-    fig = go.Figure()
-    if handover_stats and 'handover_success_rates' in handover_stats and selected_entities:
-        rates = {entity: handover_stats['handover_success_rates'].get(entity, 0) * 100 for entity in selected_entities}
-        if rates:
-            fig.add_trace(go.Bar(x=list(rates.keys()), y=list(rates.values())))
-    fig.update_layout(title="切換成功率", xaxis_title="實體 ID", yaxis_title="成功率 (%)", yaxis_range=[0, 100])
-    return fig
+def create_handover_bar_figure(selected_entities, stats_key, title, y_label, scale=1, y_range=None):
+    """按實體繪製切換統計柱狀圖（次數、成功率、乒乓率共用）"""
+    traces = []
+    if handover_stats and stats_key in handover_stats and selected_entities:
+        values = {entity: handover_stats[stats_key].get(entity, 0) * scale for entity in selected_entities}
+        traces.append({'type': 'bar', 'x': list(values.keys()), 'y': list(values.values())})
+    return figure_dict(traces, title, "實體 ID", y_label, y_range=y_range)
 
-@app.callback(
-    Output('handover-delay-boxplot', 'figure'),
-    Input('entity-selector', 'value')
-)
-def update_handover_delay_chart(selected_entities):
-    fig = go.Figure()
+def create_handover_delay_figure(selected_entities):
+    traces = []
     if handover_stats and 'handover_delays' in handover_stats and selected_entities:
         for entity in selected_entities:
             delays = handover_stats['handover_delays'].get(entity, {}).get('values', []) # 假設 JSON 中有 'values'
@@ -312,32 +256,13 @@ def update_handover_delay_chart(selected_entities):
                  delays = entity_events['Delay (ms)'].dropna().tolist()
             
             if delays:
-                fig.add_trace(go.Box(y=delays, name=entity))
-    fig.update_layout(title="切換延遲分佈", xaxis_title="實體 ID", yaxis_title="延遲 (ms)")
-    return fig
-
-@app.callback(
-    Output('ping-pong-rate-bar', 'figure'),
-    Input('entity-selector', 'value')
-)
-def update_ping_pong_rate_chart(selected_entities):
-    fig = go.Figure()
-    if handover_stats and 'ping_pong_rates' in handover_stats and selected_entities:
-        rates = {entity: handover_stats['ping_pong_rates'].get(entity, 0) * 100 for entity in selected_entities}
-        if rates:
-            fig.add_trace(go.Bar(x=list(rates.keys()), y=list(rates.values())))
-    fig.update_layout(title="乒乓切換率", xaxis_title="實體 ID", yaxis_title="比率 (%)", yaxis_range=[0, 100])
-    return fig
+                traces.append({'type': 'box', 'y': delays, 'name': entity})
+    return figure_dict(traces, "切換延遲分佈", "實體 ID", "延遲 (ms)")
 
-@app.callback(
-    Output('handover-events-timeline', 'figure'),
-    Input('entity-selector', 'value')
-)
-def update_handover_timeline(selected_entities):
+def create_handover_timeline_figure(selected_entities):
     fig = go.Figure()
     if handover_events_df is not None and not handover_events_df.empty and selected_entities:
         try:
-            handover_events_df['Timestamp'] = pd.to_datetime(handover_events_df['Timestamp'], errors='coerce')
             filtered_df = handover_events_df[handover_events_df['Entity ID'].isin(selected_entities)].dropna(subset=['Timestamp'])
             
             # 創建時間線圖 (使用 Scatter 模擬)
@@ -364,6 +289,25 @@ def update_handover_timeline(selected_entities):
         
     return fig
 
+@app.callback(
+    [Output('handover-counts-bar', 'figure'),
+     Output('handover-success-rate-bar', 'figure'),
+     Output('handover-delay-boxplot', 'figure'),
+     Output('ping-pong-rate-bar', 'figure'),
+     Output('handover-events-timeline', 'figure')],
+    Input('entity-selector', 'value')
+)
+def update_handover_charts(selected_entities):
+    return [
+        create_handover_bar_figure(selected_entities, 'handover_counts', "切換次數", "次數"),
+        create_handover_bar_figure(selected_entities, 'handover_success_rates', "切換成功率", "成功率 (%)",
+                                   scale=100, y_range=[0, 100]),
+        create_handover_delay_figure(selected_entities),
+        create_handover_bar_figure(selected_entities, 'ping_pong_rates', "乒乓切換率", "比率 (%)",
+                                   scale=100, y_range=[0, 100]),
+        create_handover_timeline_figure(selected_entities),
+    ]
+
 # --- 運行應用程序 ---
 
 if __name__ == '__main__':